@@ -0,0 +1,141 @@
+"""Режим админки для больших таблиц.
+
+FastAdminMixin подключается к ModelAdmin и убирает из списка объектов
+всё, что растёт вместе с таблицей: полный COUNT(*) заменяется оценкой,
+переход на следующие страницы идёт курсором по pk вместо OFFSET, а
+фильтры по связанным пользователям - полем ввода вместо списка всех
+пользователей.
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+CURSOR_VAR = 'cursor'
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не считает строки дальше ADMIN_COUNT_LIMIT.
+
+    До предела число строк точное. Выше - для таблицы без фильтров
+    берётся максимальный pk, для отфильтрованной - сам предел; в обоих
+    случаях estimated становится True.
+    """
+    estimated = False
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_COUNT_LIMIT
+        queryset = self.object_list.order_by()
+        count = queryset[:limit + 1].count()
+        if count <= limit:
+            return count
+        self.estimated = True
+        if not queryset.query.where:
+            return max(
+                queryset.aggregate(max_pk=Max('pk'))['max_pk'] or 0, count
+            )
+        return limit
+
+
+class FastChangeList(ChangeList):
+    """Список объектов с курсором ?cursor=<pk> для сортировки по -pk."""
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Курсор имеет смысл только для текущих фильтров и сортировки.
+        remove = [*(remove or ()), CURSOR_VAR]
+        if new_params and CURSOR_VAR in new_params:
+            remove.remove(CURSOR_VAR)
+        return super().get_query_string(new_params, remove)
+
+    def get_results(self, request):
+        super().get_results(request)
+        self.cursor_enabled = (
+            ORDER_VAR not in self.params
+            and tuple(self.model_admin.get_ordering(request)) == ('-pk',)
+        )
+        self.cursor = None
+        if not self.cursor_enabled or self.show_all:
+            return
+        try:
+            self.cursor = int(request.GET[CURSOR_VAR])
+        except (KeyError, ValueError):
+            return
+        # Срез queryset остаётся ленивым: list_editable строит по нему
+        # формсет.
+        self.result_list = self.queryset.filter(
+            pk__lt=self.cursor
+        )[:self.list_per_page]
+
+    @cached_property
+    def next_cursor(self):
+        if not self.cursor_enabled:
+            return None
+        rows = list(self.result_list)
+        if len(rows) < self.list_per_page:
+            return None
+        last = rows[-1].pk
+        if not self.queryset.filter(pk__lt=last).exists():
+            return None
+        return last
+
+    def next_cursor_url(self):
+        return self.get_query_string(
+            {CURSOR_VAR: self.next_cursor}, [PAGE_VAR]
+        )
+
+    def first_page_url(self):
+        return self.get_query_string(remove=[PAGE_VAR])
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Фильтр с полем ввода: варианты из базы не загружаются."""
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'query_string': changelist.get_query_string(
+                remove=[self.parameter_name]
+            ),
+            'hidden': [
+                (name, value) for name, value in changelist.params.items()
+                if name not in (self.parameter_name, CURSOR_VAR)
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+def username_filter(field, title):
+    """InputFilter по точному username пользователя в поле field."""
+    return type(f'{field.title()}UsernameFilter', (InputFilter,), {
+        'title': title,
+        'parameter_name': f'{field}__username',
+    })
+
+
+class FastAdminMixin:
+    """Подмешивается к ModelAdmin больших таблиц."""
+    ordering = ('-pk',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/fast_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return FastChangeList
@@ -0,0 +1,421 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим SQLite.
+
+L2 - файл SQLite, общий для всех процессов-воркеров на машине, L1 -
+небольшой LRU в памяти каждого процесса. Чтение идёт сначала в L1,
+при промахе - в L2 с сохранением в L1. Каждая запись в L2 добавляет
+ключ в журнал инвалидаций; процессы раз в SYNC_INTERVAL секунд
+читают журнал и выбрасывают из L1 изменённые другими ключи, свои
+записи L1 обновляют сразу. Так горячие ключи отдаются из памяти, а
+чужие изменения видны не позже чем через SYNC_INTERVAL.
+
+Раз в CULL_EVERY записей L2 чистится: истёкшие ключи удаляются, а если
+ключей больше MAX_ENTRIES, старейшие по записи вытесняются, как у
+встроенных бэкендов с CULL_FREQUENCY.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TwoTierCache',
+            'LOCATION': '/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {
+                'L1_MAX_ENTRIES': 1000, 'SYNC_INTERVAL': 0.5,
+                'MAX_ENTRIES': 100000, 'CULL_FREQUENCY': 10,
+            },
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Ключ журнала, означающий «сбросить весь L1».
+CLEAR_ALL = '*'
+
+# Сколько записей журнала хранить; процесс, отставший сильнее,
+# просто очищает свой L1 целиком.
+LOG_KEEP = 10000
+
+
+class SharedStore:
+    """L2: ключи уже полные (с префиксом и версией).
+
+    Значения хранятся и отдаются сериализованными pickle; L1 держит их
+    так же, чтобы вызывающий код не мог изменить закэшированный объект.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self.connection() as connection:
+            connection.executescript(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB, expires REAL);'
+                'CREATE TABLE IF NOT EXISTS invalidations ('
+                'seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT, '
+                'origin INTEGER);'
+            )
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        # После fork соединение родителя использовать нельзя.
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=10, isolation_level=None,
+                check_same_thread=False
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def log(self, connection, keys):
+        # origin - pid: свои записи процесс применяет к L1 сразу и
+        # из журнала их не перечитывает.
+        origin = os.getpid()
+        connection.executemany(
+            'INSERT INTO invalidations (key, origin) VALUES (?, ?)',
+            [(key, origin) for key in keys]
+        )
+
+    def get_many(self, keys):
+        """{key: (pickle значения, expires)} для живых ключей из keys."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        rows = self.connection().execute(
+            'SELECT key, value, expires FROM cache WHERE key IN ({}) '
+            'AND (expires IS NULL OR expires > ?)'.format(
+                ', '.join('?' * len(keys))
+            ),
+            [*keys, time.time()]
+        ).fetchall()
+        return {key: (value, expires) for key, value, expires in rows}
+
+    def set_many(self, items, expires):
+        """items - {key: pickle значения}."""
+        with self.transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                [
+                    (key, value, expires) for key, value in items.items()
+                ]
+            )
+            self.log(connection, items)
+
+    def add(self, key, value, expires):
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                'expires = excluded.expires '
+                'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+                [key, value, expires, time.time()]
+            )
+            if cursor.rowcount:
+                self.log(connection, [key])
+            return bool(cursor.rowcount)
+
+    def incr(self, key, delta):
+        """Атомарно прибавляет delta; (pickle нового значения, expires)."""
+        with self.transaction() as connection:
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                [key, time.time()]
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.dumps(
+                pickle.loads(row[0]) + delta, pickle.HIGHEST_PROTOCOL
+            )
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?', [value, key]
+            )
+            self.log(connection, [key])
+            return value, row[1]
+
+    def touch(self, key, expires):
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                [expires, key, time.time()]
+            )
+            if cursor.rowcount:
+                self.log(connection, [key])
+            return bool(cursor.rowcount)
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        with self.transaction() as connection:
+            connection.executemany(
+                'DELETE FROM cache WHERE key = ?', [(key,) for key in keys]
+            )
+            self.log(connection, keys)
+
+    def clear(self):
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM cache')
+            self.log(connection, [CLEAR_ALL])
+
+    def cull(self, max_entries, cull_frequency):
+        """Удаляет истёкшие ключи, а сверх max_entries - старейшие.
+
+        Старейшие - по порядку записи: INSERT OR REPLACE выдаёт строке
+        новый rowid. Так уходят и ключи без срока (страницы с
+        PAGE_CACHE_TIMEOUT=None), а вытеснение пишется в журнал, чтобы
+        L1 других процессов их тоже забыли (свой L1 чистит вызывающий по
+        возвращённому списку ключей). Доля вытесняемого - как у
+        встроенных бэкендов: 1/cull_frequency, 0 - всё.
+        """
+        evicted = []
+        with self.transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE expires <= ?', [time.time()]
+            )
+            count, = connection.execute(
+                'SELECT COUNT(*) FROM cache'
+            ).fetchone()
+            if count > max_entries:
+                evicted = [
+                    key for key, in connection.execute(
+                        'SELECT key FROM cache ORDER BY rowid LIMIT ?',
+                        [count // cull_frequency if cull_frequency else count]
+                    )
+                ]
+                connection.executemany(
+                    'DELETE FROM cache WHERE key = ?',
+                    [(key,) for key in evicted]
+                )
+                self.log(connection, evicted)
+            connection.execute(
+                'DELETE FROM invalidations WHERE seq <= '
+                '(SELECT MAX(seq) FROM invalidations) - ?', [LOG_KEEP]
+            )
+        return evicted
+
+    def changes_since(self, seq):
+        """(последний seq, ключи чужих записей или None - сбросить всё)."""
+        connection = self.connection()
+        first, last = connection.execute(
+            'SELECT MIN(seq), MAX(seq) FROM invalidations'
+        ).fetchone()
+        if last is None or last == seq:
+            return seq, set()
+        if seq is None or first > seq + 1:
+            return last, None
+        rows = connection.execute(
+            'SELECT key FROM invalidations WHERE seq > ? AND seq <= ? '
+            'AND origin != ?', [seq, last, os.getpid()]
+        ).fetchall()
+        keys = {key for key, in rows}
+        return last, None if CLEAR_ALL in keys else keys
+
+
+class LocalTier:
+    """L1 процесса: общий для всех потоков и экземпляров бэкенда."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+        self.seq = None
+        self.synced_at = 0
+        self.writes = 0
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            if item[1] is not None and item[1] <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return item
+
+    def set(self, key, value, expires):
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# (pid, LOCATION) -> LocalTier. pid в ключе: после fork у дочернего
+# процесса свой L1.
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+def local_tier(location, max_entries, store):
+    key = (os.getpid(), location)
+    with _tiers_lock:
+        if key not in _tiers:
+            tier = _tiers[key] = LocalTier(max_entries)
+            # Журнал читается с текущего места: старые записи к пустому
+            # L1 не относятся.
+            tier.seq, _ = store.changes_since(None)
+        return _tiers[key]
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.location = location
+        self.l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self.sync_interval = float(options.get('SYNC_INTERVAL', 0.5))
+        # Сколько записей L2 между чистками устаревших строк.
+        self.cull_every = int(options.get('CULL_EVERY', 1000))
+        self.l2 = SharedStore(location)
+
+    @property
+    def l1(self):
+        return local_tier(self.location, self.l1_max_entries, self.l2)
+
+    def sync(self):
+        """Выбрасывает из L1 ключи, изменённые другими процессами."""
+        l1 = self.l1
+        now = time.monotonic()
+        if now - l1.synced_at < self.sync_interval:
+            return
+        l1.synced_at = now
+        seq, keys = self.l2.changes_since(l1.seq)
+        with l1.lock:
+            l1.seq = seq
+            if keys is None:
+                l1.entries.clear()
+            else:
+                l1.delete(keys)
+
+    def wrote(self, count=1):
+        l1 = self.l1
+        l1.writes += count
+        if l1.writes >= self.cull_every:
+            l1.writes = 0
+            self.l1.delete(
+                self.l2.cull(self._max_entries, self._cull_frequency)
+            )
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        self.sync()
+        l1 = self.l1
+        made = {}
+        for key in keys:
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            made[made_key] = key
+        found = {}
+        missing = []
+        for made_key, key in made.items():
+            item = l1.get(made_key)
+            if item is None:
+                missing.append(made_key)
+            else:
+                found[key] = pickle.loads(item[0])
+        if not missing:
+            return found
+        seq = l1.seq
+        for made_key, (value, expires) in self.l2.get_many(missing).items():
+            # Если журнал прочитан во время запроса к L2, значение могло
+            # уже устареть - в L1 его не кладём.
+            if l1.seq == seq:
+                l1.set(made_key, value, expires)
+            found[made[made_key]] = pickle.loads(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        items = {}
+        for key, value in data.items():
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            items[made_key] = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if timeout == 0:
+            self.l1.delete(items)
+            self.l2.delete_many(items)
+            return []
+        self.l2.set_many(items, expires)
+        for made_key, value in items.items():
+            self.l1.set(made_key, value, expires)
+        self.wrote(len(items))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expires = self.get_backend_timeout(timeout)
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if not self.l2.add(key, value, expires):
+            return False
+        self.l1.set(key, value, expires)
+        self.wrote()
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        value, expires = self.l2.incr(key, delta)
+        self.l1.set(key, value, expires)
+        return pickle.loads(value)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self.l1.delete([key])
+        return self.l2.touch(key, self.get_backend_timeout(timeout))
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version=version)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        made_keys = [self.make_key(key, version=version) for key in keys]
+        for key in made_keys:
+            self.validate_key(key)
+        self.l1.delete(made_keys)
+        self.l2.delete_many(made_keys)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs):
+        # Соединение с L2 живёт всё время жизни потока, как у LocMemCache.
+        pass
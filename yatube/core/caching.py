@@ -0,0 +1,227 @@
+"""Чтение из кэша с защитой от лавины пересчётов.
+
+get_or_compute(key, compute, timeout) отдаёт значение из кэша и сам
+решает, когда его пересчитать:
+
+* single-flight: пересчитывает только запрос, взявший блокировку
+  cache.add(key + ':lock'); остальные ждут его результата. Снимает
+  блокировку только её владелец: если пересчёт шёл дольше
+  CACHE_LOCK_TIMEOUT и блокировку уже взял другой, она остаётся;
+* stale-while-revalidate: значение хранится ещё CACHE_STALE_TTL секунд
+  после устаревания, и пока один запрос пересчитывает, другие получают
+  прежнее. Ключам, в которые входят версии (posts.page_cache), после
+  записи устаревать нечему - старый ключ просто не находится; для них
+  stale_key - ключ без версий с последним удачным значением, и его
+  отдают, пока один запрос считает новое;
+* вероятностное раннее истечение (XFetch): чем ближе срок и чем дольше
+  пересчёт, тем вероятнее запрос обновит значение заранее, так что
+  популярный ключ обычно обновляется до того, как устареет.
+
+Счётчики событий копятся в памяти процесса и раз в
+CACHE_METRICS_FLUSH секунд добавляются в общий кэш
+(см. команду cache_metrics).
+"""
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+Entry = namedtuple('Entry', ('value', 'fresh_until', 'delta'))
+
+# Сколько ждать между проверками, пока значение считает другой запрос.
+POLL_INTERVAL = 0.05
+
+EVENTS = (
+    'hits', 'misses', 'stale_served', 'early_refreshes', 'recomputes',
+    'coalesced', 'lock_timeouts',
+)
+
+METRICS_NAMES_KEY = 'cache_metrics:names'
+
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def metric_key(name, event):
+    return f'cache_metrics:{name}:{event}'
+
+
+def count(name, event, value=1):
+    global _flushed_at
+    with _metrics_lock:
+        _metrics[name, event] += value
+        if time.monotonic() - _flushed_at < settings.CACHE_METRICS_FLUSH:
+            return
+        _flushed_at = time.monotonic()
+        pending = dict(_metrics)
+        _metrics.clear()
+    flush(pending)
+
+
+def flush(pending):
+    """Добавляет накопленные счётчики процесса в общий кэш."""
+    names = cache.get(METRICS_NAMES_KEY) or set()
+    new_names = {name for name, _ in pending} - names
+    if new_names:
+        cache.set(METRICS_NAMES_KEY, names | new_names, None)
+    for (name, event), value in pending.items():
+        key = metric_key(name, event)
+        if not cache.add(key, value, None):
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.set(key, value, None)
+
+
+def get_metrics(events=EVENTS):
+    """{имя: {событие: число}} по всем процессам.
+
+    Имена, у которых нет ни одного из событий events, пропускаются:
+    счётчики пишут и другие модули (см. core.middleware).
+    """
+    with _metrics_lock:
+        pending = dict(_metrics)
+        _metrics.clear()
+    if pending:
+        flush(pending)
+    names = sorted(cache.get(METRICS_NAMES_KEY) or ())
+    values = cache.get_many(
+        [metric_key(name, event) for name in names for event in events]
+    )
+    metrics = {
+        name: {
+            event: values.get(metric_key(name, event), 0)
+            for event in events
+        }
+        for name in names
+    }
+    return {
+        name: counts for name, counts in metrics.items()
+        if any(counts.values())
+    }
+
+
+def needs_refresh(entry, now):
+    if entry.fresh_until is None:
+        return False
+    # XFetch: delta * beta * -ln(rand) - случайный запас до срока.
+    jitter = -entry.delta * settings.CACHE_EARLY_EXPIRY_BETA * math.log(
+        1 - random.random()
+    )
+    return now + jitter >= entry.fresh_until
+
+
+def acquire(lock_key):
+    """Токен взятой блокировки или None, если её держит другой."""
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, settings.CACHE_LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def release(lock_key, token):
+    # Истёкшую блокировку мог взять другой запрос - её не трогаем.
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def store(key, value, timeout, delta):
+    if timeout is None:
+        cache.set(key, Entry(value, None, delta), None)
+    else:
+        cache.set(
+            key, Entry(value, time.time() + timeout, delta),
+            timeout + settings.CACHE_STALE_TTL
+        )
+
+
+def recompute(key, compute, timeout, name, stale_key=None):
+    count(name, 'recomputes')
+    started = time.monotonic()
+    value = compute()
+    if value is None:
+        return None
+    delta = time.monotonic() - started
+    store(key, value, timeout, delta)
+    if stale_key is not None:
+        store(stale_key, value, timeout, delta)
+    return value
+
+
+def refresh(key, entry, compute, timeout, name, now, stale_key):
+    """Свежее или устаревшее значение, которое пора обновить."""
+    lock_key = f'{key}:lock'
+    stale = entry.fresh_until <= now
+    token = acquire(lock_key)
+    if token is None:
+        # Пересчитывает другой запрос - отдаём то, что есть.
+        count(name, 'stale_served' if stale else 'hits')
+        count(name, 'coalesced')
+        return entry.value
+    if not stale:
+        count(name, 'early_refreshes')
+    try:
+        return recompute(key, compute, timeout, name, stale_key)
+    finally:
+        release(lock_key, token)
+
+
+def compute_once(key, compute, timeout, name, stale_key):
+    """Промах: считает один запрос, взявший блокировку.
+
+    Остальные отдают последнее удачное значение из stale_key, а если
+    его нет - ждут результата.
+    """
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    token = acquire(lock_key)
+    if token is None and stale_key is not None:
+        entry = cache.get(stale_key)
+        if isinstance(entry, Entry):
+            count(name, 'stale_served')
+            count(name, 'coalesced')
+            return entry.value
+    while token is None:
+        if time.monotonic() >= deadline:
+            count(name, 'lock_timeouts')
+            return recompute(key, compute, timeout, name, stale_key)
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if isinstance(entry, Entry):
+            count(name, 'coalesced')
+            return entry.value
+        token = acquire(lock_key)
+    try:
+        # Значение могло появиться, пока брали блокировку.
+        entry = cache.get(key)
+        if isinstance(entry, Entry):
+            return entry.value
+        return recompute(key, compute, timeout, name, stale_key)
+    finally:
+        release(lock_key, token)
+
+
+def get_or_compute(key, compute, timeout, name='default', stale_key=None):
+    """Значение key из кэша или compute(), пересчитанное одним запросом.
+
+    timeout - сколько секунд значение свежее (None - пока ключ не
+    удалят). Если compute() вернул None, ничего не кэшируется.
+    name - под каким именем считать метрики. stale_key - ключ без
+    версий, где хранится последнее удачное значение для
+    stale-while-revalidate.
+    """
+    entry = cache.get(key)
+    now = time.time()
+    if not isinstance(entry, Entry):
+        count(name, 'misses')
+        return compute_once(key, compute, timeout, name, stale_key)
+    if needs_refresh(entry, now):
+        return refresh(key, entry, compute, timeout, name, now, stale_key)
+    count(name, 'hits')
+    return entry.value
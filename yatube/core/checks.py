@@ -0,0 +1,148 @@
+"""Проверки профиля производительности (manage.py check).
+
+В production (settings.PRODUCTION) каждая известная медленная настройка
+- ошибка, и check, migrate и runserver не запускаются, пока её не
+исправят. Несобранную статику проверяет только check --deploy: иначе
+не запустился бы и сам collectstatic. В dev проверки молчат.
+"""
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestFilesMixin
+from django.core.checks import Error, register
+from django.core.files.storage import get_storage_class
+from django.db import connections
+
+DEBUG_TOOLBAR_MIDDLEWARE = 'debug_toolbar.middleware.DebugToolbarMiddleware'
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+# Кэши, которые не общие для воркеров или ничего не хранят.
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Сессии, которые читаются из базы на каждый запрос.
+DB_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.db',
+)
+
+
+def check_debug():
+    errors = []
+    if settings.DEBUG:
+        errors.append(Error(
+            'DEBUG включён: Django копит все SQL-запросы в памяти.',
+            hint='Не включайте DEBUG в production.',
+            id='core.E001',
+        ))
+    if (
+        'debug_toolbar' in settings.INSTALLED_APPS
+        or DEBUG_TOOLBAR_MIDDLEWARE in settings.MIDDLEWARE
+    ):
+        errors.append(Error(
+            'debug_toolbar подключён и обрабатывает каждый запрос.',
+            hint='Подключайте debug_toolbar только при DEBUG.',
+            id='core.E002',
+        ))
+    return errors
+
+
+def uses_cached_loader(loaders):
+    return any(
+        (loader[0] if isinstance(loader, (list, tuple)) else loader)
+        == CACHED_LOADER
+        for loader in loaders
+    )
+
+
+def check_templates():
+    errors = []
+    for backend in settings.TEMPLATES:
+        if not backend['BACKEND'].endswith('DjangoTemplates'):
+            continue
+        options = backend.get('OPTIONS', {})
+        # Без явных loaders Django сам кэширует шаблоны, если нет debug.
+        cached = (
+            uses_cached_loader(options['loaders']) if 'loaders' in options
+            else not options.get('debug', settings.DEBUG)
+        )
+        if not cached:
+            errors.append(Error(
+                'Шаблоны загружаются и компилируются на каждый запрос.',
+                hint=f'Подключите {CACHED_LOADER}.',
+                id='core.E003',
+            ))
+    return errors
+
+
+def check_databases():
+    return [
+        Error(
+            f'Соединение с базой {alias} открывается на каждый запрос.',
+            hint='Задайте CONN_MAX_AGE больше нуля или None.',
+            id='core.E004',
+        )
+        for alias in connections
+        if connections[alias].settings_dict['CONN_MAX_AGE'] == 0
+    ]
+
+
+def check_caches():
+    errors = [
+        Error(
+            f'Кэш {alias} не общий для воркеров.',
+            hint='Используйте core.cache.TwoTierCache или другой '
+                 'общий кэш.',
+            id='core.E005',
+        )
+        for alias, cache in settings.CACHES.items()
+        if cache['BACKEND'] in PER_PROCESS_CACHES
+    ]
+    if settings.SESSION_ENGINE in DB_SESSION_ENGINES:
+        errors.append(Error(
+            'Сессия читается из базы на каждый запрос.',
+            hint='Используйте django.contrib.sessions.backends.cached_db.',
+            id='core.E006',
+        ))
+    return errors
+
+
+@register('performance', deploy=True)
+def check_static(app_configs, **kwargs):
+    if not settings.PRODUCTION:
+        return []
+    storage_class = get_storage_class(settings.STATICFILES_STORAGE)
+    if not issubclass(storage_class, ManifestFilesMixin):
+        return []
+    manifest = os.path.join(
+        settings.STATIC_ROOT or '', storage_class.manifest_name
+    )
+    if os.path.exists(manifest):
+        return []
+    return [Error(
+        'Статика не собрана: шаблоны отдают имена без хэша, и её '
+        'нельзя кэшировать навсегда.',
+        hint='Выполните manage.py collectstatic.',
+        id='core.E007',
+    )]
+
+
+def check_thumbnails():
+    if settings.THUMBNAIL_WORKERS:
+        return []
+    return [Error(
+        'Миниатюры создаются в потоке запроса.',
+        hint='Задайте THUMBNAIL_WORKERS больше нуля.',
+        id='core.E008',
+    )]
+
+
+@register('performance')
+def check_performance(app_configs, **kwargs):
+    if not settings.PRODUCTION:
+        return []
+    return [
+        *check_debug(), *check_templates(), *check_databases(),
+        *check_caches(), *check_thumbnails(),
+    ]
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.caching import get_metrics
+from core.middleware import EVENTS
+
+
+class Command(BaseCommand):
+    help = 'Показывает метрики сжатия ответов по всем процессам.'
+
+    def handle(self, *args, **options):
+        metrics = get_metrics(EVENTS)
+        if not metrics:
+            self.stdout.write('Метрик пока нет.')
+            return
+        columns = ('responses', 'bytes_in', 'bytes_out', 'ratio', 'cpu_ms')
+        self.stdout.write(' '.join(['name'.ljust(16), *columns]))
+        for name, values in metrics.items():
+            ratio = values['bytes_in'] / max(values['bytes_out'], 1)
+            row = (
+                values['responses'], values['bytes_in'], values['bytes_out'],
+                f'{ratio:.2f}', f"{values['cpu_us'] / 1000:.1f}"
+            )
+            self.stdout.write(' '.join(
+                [name.ljust(16)]
+                + [str(value).rjust(len(column))
+                   for value, column in zip(row, columns)]
+            ))
@@ -0,0 +1,72 @@
+import os
+from multiprocessing import Pool
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.thumbnails import generate, presets
+
+
+def source_files():
+    """[(имя файла, пресеты)] всех картинок из THUMBNAIL_PRESETS.
+
+    Пресеты - те же, что при загрузке, с WEBP-копиями (см.
+    core.thumbnails.presets).
+    """
+    jobs = []
+    for label in settings.THUMBNAIL_PRESETS:
+        model_label, field = label.rsplit('.', 1)
+        model = apps.get_model(model_label)
+        field_presets = presets(model, field)
+        names = model.objects.exclude(
+            **{field: ''}
+        ).exclude(
+            **{f'{field}__isnull': True}
+        ).order_by().values_list(field, flat=True).distinct()
+        jobs.extend((name, field_presets) for name in names)
+    return jobs
+
+
+def generate_job(job):
+    name, field_presets = job
+    try:
+        generate(name, field_presets)
+    except Exception as error:
+        return name, error
+    return name, None
+
+
+class Command(BaseCommand):
+    help = 'Заготавливает миниатюры всех загруженных картинок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов; по умолчанию - по числу ядер.'
+        )
+
+    def handle(self, *args, **options):
+        jobs = source_files()
+        workers = max(1, options['workers'])
+        if workers == 1:
+            self.report(map(generate_job, jobs), len(jobs))
+            return
+        # Дочерние процессы не должны делить соединение с родителем.
+        connections.close_all()
+        with Pool(workers) as pool:
+            self.report(pool.imap_unordered(generate_job, jobs), len(jobs))
+
+    def report(self, results, total):
+        failed = 0
+        for done, (name, error) in enumerate(results, 1):
+            if error is not None:
+                failed += 1
+                self.stderr.write(f'\n{name}: {error}')
+            self.stdout.write(f'\r{done}/{total}', ending='')
+            self.stdout.flush()
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {total - failed} из {total}.'
+        ))
@@ -0,0 +1,163 @@
+"""Сжатие ответов.
+
+CompressionMiddleware выбирает по Accept-Encoding brotli (если пакет
+установлен) или gzip, а уровень - по типу содержимого и размеру
+(COMPRESS_LEVELS): большие и потоковые ответы сжимаются быстрее, чтобы
+не задерживать первый байт. StreamingHttpResponse сжимается по частям
+без буферизации всего ответа, каждая часть сразу уходит клиенту.
+Типы, которых нет в COMPRESS_LEVELS (картинки, архивы), уже сжаты и
+отдаются как есть.
+
+Для каждой кодировки считаются ответы, байты до и после сжатия и
+время процессора (см. команду compression_metrics).
+"""
+import re
+import time
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .caching import count
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+EVENTS = ('responses', 'bytes_in', 'bytes_out', 'cpu_us')
+
+ACCEPT_ENCODING_RE = re.compile(
+    r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$'
+)
+
+
+def accepted_encodings(header):
+    """{кодировка: q} из заголовка Accept-Encoding."""
+    accepted = {}
+    for item in header.split(','):
+        match = ACCEPT_ENCODING_RE.match(item)
+        if not match:
+            continue
+        coding, quality = match.groups()
+        try:
+            accepted[coding.lower()] = float(quality or 1)
+        except ValueError:
+            continue
+    return accepted
+
+
+def supported_encodings():
+    # По порядку предпочтения при равном q.
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(header):
+    """Лучшая из поддерживаемых кодировок или None."""
+    accepted = accepted_encodings(header)
+    best, best_quality = None, 0
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def choose_level(encoding, content_type, size=None):
+    """Уровень сжатия; size=None - потоковый ответ."""
+    level, fast_level = settings.COMPRESS_LEVELS[content_type][encoding]
+    if size is None or size > settings.COMPRESS_LARGE_SIZE:
+        return fast_level
+    return level
+
+
+def compressor(encoding, level):
+    """(сжать часть, завершить поток) для кодировки encoding."""
+    if encoding == 'br':
+        stream = brotli.Compressor(quality=level)
+        return (
+            lambda chunk: stream.process(chunk) + stream.flush(),
+            stream.finish
+        )
+    # wbits=31 - формат gzip с заголовком и контрольной суммой.
+    stream = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return (
+        lambda chunk: (
+            stream.compress(chunk) + stream.flush(zlib.Z_SYNC_FLUSH)
+        ),
+        stream.flush
+    )
+
+
+def record(encoding, size, compressed_size, cpu_seconds):
+    name = f'compress:{encoding}'
+    count(name, 'responses')
+    count(name, 'bytes_in', size)
+    count(name, 'bytes_out', compressed_size)
+    count(name, 'cpu_us', int(cpu_seconds * 10 ** 6))
+
+
+def compress(content, encoding, level):
+    started = time.thread_time()
+    process, finish = compressor(encoding, level)
+    compressed = process(content) + finish()
+    record(
+        encoding, len(content), len(compressed),
+        time.thread_time() - started
+    )
+    return compressed
+
+
+def compress_stream(chunks, encoding, level):
+    """Сжимает поток по частям; метрики пишутся в конце потока."""
+    size = compressed_size = 0
+    cpu_seconds = 0
+    process, finish = compressor(encoding, level)
+    for chunk in chunks:
+        started = time.thread_time()
+        compressed = process(chunk)
+        cpu_seconds += time.thread_time() - started
+        size += len(chunk)
+        compressed_size += len(compressed)
+        if compressed:
+            yield compressed
+    tail = finish()
+    compressed_size += len(tail)
+    record(encoding, size, compressed_size, cpu_seconds)
+    yield tail
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0]
+        content_type = content_type.strip().lower()
+        if content_type not in settings.COMPRESS_LEVELS:
+            return response
+        size = None if response.streaming else len(response.content)
+        if size is not None and size < settings.COMPRESS_MIN_SIZE:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        level = choose_level(encoding, content_type, size)
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding, level
+            )
+            del response['Content-Length']
+        else:
+            compressed = compress(response.content, encoding, level)
+            if len(compressed) >= size:
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # Сжатое тело отличается побайтно: тег становится слабым.
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -27,3 +27,16 @@ class CreatedModel(models.Model):
 
     def __str__(self) -> str:
         return self.text[:15]
+
+
+class StoredFile(models.Model):
+    """Файл в core.storage.ContentAddressedStorage и число ссылок на него."""
+    name = models.CharField('Имя файла', max_length=255, primary_key=True)
+    refs = models.PositiveIntegerField('Число ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self) -> str:
+        return self.name
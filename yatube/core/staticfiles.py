@@ -0,0 +1,87 @@
+"""Сборка статики: имена с хэшем и заранее сжатые копии.
+
+collectstatic сохраняет каждый файл ещё и под именем с хэшем содержимого
+(css/icons.55e7cbb9ba48.css), переписывает ссылки url() в CSS и
+записывает соответствие имён в staticfiles.json. {% static %} отдаёт
+имена с хэшем, поэтому такие файлы можно кэшировать навсегда.
+
+Рядом с каждым сжимаемым файлом с хэшем пишутся .gz и, если установлен
+brotli, .br: веб-сервер отдаёт их как есть (gzip_static и brotli_static
+в nginx) и не сжимает статику на каждый запрос.
+"""
+import gzip
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def gzip_compress(content):
+    # mtime=0: одинаковый файл всегда сжимается в одинаковые байты.
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def brotli_compress(content):
+    return brotli.compress(content, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        """Имя с хэшем; в разработке и тестах - name, если файла нет.
+
+        Без collectstatic (разработка, тесты) шаблоны отдают исходные
+        имена, а не падают. В production файл вне сборки - ошибка, как
+        у ManifestStaticFilesStorage: иначе страница сослалась бы на
+        имя без хэша, закэшированное навсегда.
+        """
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if settings.DEBUG or settings.TESTING:
+                return name
+            raise
+
+    def compressors(self):
+        compressors = [('.gz', gzip_compress)]
+        if brotli is not None:
+            compressors.append(('.br', brotli_compress))
+        return compressors
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            for compressed_name in self.compress(name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        """Пишет сжатые копии файла name; возвращает их имена.
+
+        Имя с хэшем не меняет содержимого, поэтому готовые копии не
+        пересжимаются. Копия, которая почти не меньше файла, не нужна.
+        """
+        extension = os.path.splitext(name)[1]
+        if extension not in settings.STATIC_COMPRESS_EXTENSIONS:
+            return []
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < settings.STATIC_COMPRESS_MIN_SIZE:
+            return []
+        written = []
+        for suffix, compress in self.compressors():
+            compressed_name = name + suffix
+            if self.exists(compressed_name):
+                written.append(compressed_name)
+                continue
+            compressed = compress(content)
+            if len(compressed) < len(content) * 0.95:
+                self._save(compressed_name, ContentFile(compressed))
+                written.append(compressed_name)
+        return written
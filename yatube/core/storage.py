@@ -0,0 +1,118 @@
+"""Хранилище загрузок, адресуемое по содержимому.
+
+Файл сохраняется под именем из SHA-256 своего содержимого, разложенным
+по вложенным каталогам: posts/ab/cd/abcd...ef.jpg. Каталог upload_to
+и расширение берутся из исходного имени. Одинаковые загрузки попадают
+в один файл, а StoredFile считает ссылки на него: delete() уменьшает
+счётчик и удаляет файл только вместе с последней ссылкой. Содержимое
+по такому адресу никогда не меняется, поэтому медиа можно отдавать с
+бессрочным кэшированием (core.views.media в dev, deploy/nginx.conf в
+production).
+"""
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import F
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from .models import StoredFile
+
+# Имена, под которыми содержимое не меняется: наши и миниатюры sorl
+# (cache/ab/cd/<md5>.jpg).
+IMMUTABLE_NAME_RE = re.compile(
+    r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{32,64}\.\w+$'
+)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Настоящее имя зависит от содержимого и выбирается в _save;
+        # совпадение имён означает совпадение содержимого.
+        return name
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        return posixpath.join(
+            posixpath.dirname(name.replace('\\', '/')),
+            digest[:2], digest[2:4],
+            digest + os.path.splitext(name)[1].lower()
+        )
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        # Файл проверяется и пишется под блокировкой строки: иначе
+        # параллельный release мог бы удалить его сразу после проверки.
+        with transaction.atomic():
+            StoredFile.objects.select_for_update().get_or_create(name=name)
+            StoredFile.objects.filter(name=name).update(refs=F('refs') + 1)
+            if not self.exists(name):
+                self.write(name, content)
+        return name
+
+    def write(self, name, content):
+        """Пишет файл через временный файл и rename.
+
+        Параллельная запись того же содержимого не оставит
+        недописанный файл.
+        """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    temp_file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def release(self, name):
+        """Снимает одну ссылку; True, если файл удалён.
+
+        Файлы без StoredFile (загруженные до этого хранилища) не
+        удаляются: неизвестно, кто ещё на них ссылается.
+        """
+        stored = StoredFile.objects.filter(name=name)
+        with transaction.atomic():
+            # UPDATE первым блокирует строку (в SQLite - всю базу) до
+            # удаления файла, и _save не увидит файл, которого нет.
+            if not stored.update(refs=F('refs') - 1):
+                return False
+            if stored.filter(refs__gt=0).exists():
+                return False
+            stored.delete()
+            super().delete(name)
+        return True
+
+    def delete(self, name):
+        self.release(name)
+
+
+def release_file(name):
+    """Снимает ссылку модели на файл name после коммита транзакции.
+
+    Если ссылка была последней, удаляются файл и его миниатюры.
+    """
+    if not name or not isinstance(default_storage, ContentAddressedStorage):
+        return
+
+    def release():
+        if default_storage.release(name):
+            delete_thumbnails(
+                ImageFile(name, default_storage), delete_file=False
+            )
+
+    transaction.on_commit(release)
@@ -0,0 +1,19 @@
+from django import template
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/picture.html')
+def picture(picture, sizes, css='', alt='', loading='lazy'):
+    """<img> со srcset по Picture из core.thumbnails.attach.
+
+    sizes - атрибут sizes для выбора ширины браузером. loading='eager'
+    - для картинки, которая точно видна при загрузке страницы.
+    """
+    return {
+        'picture': picture,
+        'sizes': sizes,
+        'css': css,
+        'alt': alt,
+        'loading': loading,
+    }
@@ -0,0 +1,284 @@
+"""Миниатюры картинок, заготовленные заранее.
+
+Шаблоны берут миниатюры у полей моделей по THUMBNAIL_PRESETS
+(геометрия и параметры как у sorl.thumbnail). Без заготовки sorl
+декодирует и ужимает исходник прямо во время рендеринга у первого
+зрителя. schedule(instance) после сохранения картинки отдаёт эту
+работу фоновому пулу потоков, а команда generate_thumbnails
+заготавливает миниатюры для уже загруженных файлов.
+
+Страница не обращается к sorl по картинке: attach() находит записи
+всех миниатюр всех картинок страницы одним get_many к кэшу (и одним
+запросом к базе для промахов) и отдаёт Picture - набор ширин для
+srcset (тег {% picture %}). Если миниатюр ещё нет, отдаётся
+исходник, а миниатюры ставятся в очередь; когда они готовы,
+отправляется сигнал thumbnails_ready.
+"""
+import logging
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.dispatch import Signal
+from PIL import features
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.helpers import tokey
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+logger = logging.getLogger(__name__)
+
+# Отправляется с name - именем исходника, когда его миниатюры созданы.
+thumbnails_ready = Signal(providing_args=['name'])
+
+# Поддерживает ли Pillow запись WEBP: тогда к каждому пресету
+# добавляется такой же в WEBP.
+WEBP = features.check('webp')
+
+# format - формат из пресета (None - как у sorl по умолчанию).
+Thumbnail = namedtuple('Thumbnail', ('url', 'width', 'height', 'format'))
+
+
+class Picture:
+    """Готовые миниатюры картинки для <img srcset> и исходник.
+
+    Исходник показывается, пока ни одной миниатюры нет.
+    """
+
+    def __init__(self, thumbnails, original):
+        self.thumbnails = sorted(thumbnails, key=lambda thumb: thumb.width)
+        self.original = original
+
+    @property
+    def ready(self):
+        return bool(self.thumbnails)
+
+    def candidates(self, image_format=None):
+        return [
+            thumb for thumb in self.thumbnails
+            if thumb.format == image_format
+        ]
+
+    @property
+    def src(self):
+        """Самая крупная миниатюра основного формата или исходник."""
+        candidates = self.candidates()
+        return candidates[-1] if candidates else self.original
+
+    @property
+    def url(self):
+        return self.src.url
+
+    @staticmethod
+    def srcset_of(candidates):
+        return ', '.join(
+            f'{thumb.url} {thumb.width}w' for thumb in candidates
+        )
+
+    @property
+    def srcset(self):
+        return self.srcset_of(self.candidates())
+
+    @property
+    def webp_srcset(self):
+        return self.srcset_of(self.candidates('WEBP'))
+
+
+# pid -> пул потоков: после fork пул родителя не работает.
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def presets(model, field):
+    """[(геометрия, параметры)] для поля field модели model."""
+    label = f'{model._meta.label}.{field}'
+    field_presets = settings.THUMBNAIL_PRESETS.get(label, [])
+    if WEBP and settings.THUMBNAIL_WEBP:
+        field_presets = field_presets + [
+            (geometry, {**options, 'format': 'WEBP'})
+            for geometry, options in field_presets
+        ]
+    return field_presets
+
+
+def generate(name, field_presets):
+    """Создаёт миниатюры файла name; возвращает их число."""
+    source = ImageFile(name, default_storage)
+    if not source.exists():
+        return 0
+    for geometry, options in field_presets:
+        get_thumbnail(source, geometry, **options)
+    thumbnails_ready.send(sender=None, name=name)
+    return len(field_presets)
+
+
+def generate_safely(name, field_presets):
+    try:
+        generate(name, field_presets)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', name)
+
+
+def generate_in_pool(name, field_presets):
+    try:
+        generate_safely(name, field_presets)
+    finally:
+        # Поток пула не обслуживает запросы, и соединение с базой
+        # (хранилище ключей sorl) за ним никто не закроет.
+        connection.close()
+
+
+def executor():
+    pid = os.getpid()
+    with _executors_lock:
+        if pid not in _executors:
+            _executors[pid] = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+        return _executors[pid]
+
+
+def schedule_file(name, field_presets):
+    """Создаёт миниатюры файла name в фоне после коммита транзакции.
+
+    После коммита - чтобы поток не увидел файл, запись о котором ещё
+    может откатиться.
+    """
+    if not settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: generate_safely(name, field_presets))
+        return
+    transaction.on_commit(
+        lambda: executor().submit(generate_in_pool, name, field_presets)
+    )
+
+
+def schedule(instance, field='image'):
+    """Заготавливает миниатюры картинки instance в фоне."""
+    file = getattr(instance, field)
+    field_presets = presets(type(instance), field)
+    if file and field_presets:
+        # Одинаковые загрузки хранятся в одном файле (core.storage):
+        # его миниатюры заготавливаются один раз.
+        schedule_pending(file.name, field_presets)
+
+
+def full_options(source, options):
+    """options, дополненные так же, как в ThumbnailBackend.get_thumbnail.
+
+    От них зависит имя файла миниатюры, а значит, и ключ её записи.
+    """
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def thumbnail_file(source, geometry, options):
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, full_options(source, options)
+    )
+    return ImageFile(name, default.storage)
+
+
+def load_records(keys):
+    """{ключ: запись sorl} - как KVStore._get_raw, но для всех ключей."""
+    kv_cache = caches[sorl_settings.THUMBNAIL_CACHE]
+    values = kv_cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStore.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        if found:
+            kv_cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(found)
+    return {
+        key: value for key, value in values.items()
+        if value and value != EMPTY_VALUE
+    }
+
+
+def resolve(files, field_presets):
+    """[Picture или None] для файлов files со всеми пресетами поля.
+
+    Записи всех миниатюр всех файлов читаются одним get_many. Если у
+    файла нет хотя бы одной миниатюры, они ставятся в очередь (не чаще
+    раза в THUMBNAIL_PENDING_TIMEOUT секунд на файл).
+    """
+    targets = {}
+    for file in files:
+        if not file or (file.name, 0) in targets:
+            continue
+        source = ImageFile(file)
+        for index, (geometry, options) in enumerate(field_presets):
+            targets[file.name, index] = thumbnail_file(
+                source, geometry, options
+            )
+    keys = {
+        add_prefix(thumbnail.key): target
+        for target, thumbnail in targets.items()
+    }
+    records = load_records(list(keys))
+    found = {}
+    for key, (name, index) in keys.items():
+        if key in records:
+            image = deserialize_image_file(records[key])
+            found.setdefault(name, []).append(Thumbnail(
+                image.url, image.x, image.y,
+                field_presets[index][1].get('format')
+            ))
+    for name in {name for name, _ in targets}:
+        if len(found.get(name, ())) < len(field_presets):
+            schedule_pending(name, field_presets)
+    return [
+        Picture(found.get(file.name, []), original(file)) if file else None
+        for file in files
+    ]
+
+
+def schedule_pending(name, field_presets):
+    pending_key = f'thumbnails:pending:{tokey(name)}'
+    if cache.add(pending_key, 1, settings.THUMBNAIL_PENDING_TIMEOUT):
+        schedule_file(name, field_presets)
+
+
+def original(file):
+    """Исходник с размерами, записанными при загрузке (core.uploads)."""
+    return Thumbnail(
+        file.url,
+        getattr(file.instance, 'image_width', None),
+        getattr(file.instance, 'image_height', None),
+        None
+    )
+
+
+def attach(instances, field='image', attr='thumbnail'):
+    """Проставляет instances атрибут attr - Picture картинки field."""
+    instances = list(instances)
+    if not instances:
+        return
+    field_presets = presets(type(instances[0]), field)
+    if not field_presets:
+        return
+    pictures = resolve(
+        [getattr(instance, field) for instance in instances], field_presets
+    )
+    for instance, picture in zip(instances, pictures):
+        setattr(instance, attr, picture)
@@ -0,0 +1,129 @@
+"""Приём загруженных картинок.
+
+Загрузка пишется во временный файл на диске (FILE_UPLOAD_HANDLERS), а
+форма вместо исходника сохраняет нормализованный мастер:
+
+* файл больше UPLOAD_MAX_BYTES или картинка больше UPLOAD_MAX_PIXELS
+  пикселей отклоняются до декодирования (защита от «бомб»);
+* поворот из EXIF применяется к пикселям, а сами EXIF, комментарии и
+  прочие метаданные не сохраняются;
+* стороны ужимаются до UPLOAD_MAX_SIDE, JPEG пишется прогрессивным с
+  качеством UPLOAD_JPEG_QUALITY, PNG и GIF - с оптимизацией, прочие
+  форматы переводятся в JPEG или PNG (если есть прозрачность).
+
+Ширина, высота и размер мастера в байтах сохраняются в модели, чтобы
+шаблонам и миниатюрам не приходилось открывать файл.
+"""
+import os
+from collections import namedtuple
+from io import BytesIO
+
+from django import forms
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+Master = namedtuple('Master', ('file', 'width', 'height', 'size'))
+
+# Формат -> (расширение, параметры сохранения).
+SAVE_OPTIONS = {
+    'JPEG': ('.jpg', {'optimize': True, 'progressive': True}),
+    'PNG': ('.png', {'optimize': True}),
+    'GIF': ('.gif', {'optimize': True}),
+}
+
+# Сведения image.info, от которых зависит вид картинки. Остальное -
+# EXIF, текстовые чанки PNG, комментарии GIF - PNG и GIF записали бы
+# в мастер как есть.
+KEPT_INFO = ('icc_profile', 'transparency', 'background', 'duration', 'loop')
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+
+
+def check_limits(upload, image):
+    if upload.size > settings.UPLOAD_MAX_BYTES:
+        raise forms.ValidationError(
+            'Файл больше %(limit)s.',
+            code='file_too_large',
+            params={'limit': filesizeformat(settings.UPLOAD_MAX_BYTES)}
+        )
+    width, height = image.size
+    if width * height > settings.UPLOAD_MAX_PIXELS:
+        raise forms.ValidationError(
+            'Картинка больше %(limit)s мегапикселей.',
+            code='too_many_pixels',
+            params={'limit': settings.UPLOAD_MAX_PIXELS // 10 ** 6}
+        )
+
+
+def normalize(image):
+    """(картинка, формат) для сохранения мастера."""
+    source_format = image.format
+    max_side = settings.UPLOAD_MAX_SIDE
+    if source_format == 'JPEG':
+        # JPEG декодируется сразу в уменьшенном масштабе.
+        image.draft('RGB', (max_side, max_side))
+    if source_format == 'GIF' and getattr(image, 'is_animated', False):
+        if max(image.size) <= max_side:
+            return image, 'GIF'
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if source_format in SAVE_OPTIONS:
+        return image, source_format
+    if has_alpha(image):
+        return image.convert('RGBA'), 'PNG'
+    return image.convert('RGB'), 'JPEG'
+
+
+def ingest(upload):
+    """Master из загруженного файла; ValidationError, если он негоден."""
+    upload.seek(0)
+    image = Image.open(upload)
+    check_limits(upload, image)
+    image, image_format = normalize(image)
+    extension, options = SAVE_OPTIONS[image_format]
+    if image_format == 'JPEG':
+        options = {**options, 'quality': settings.UPLOAD_JPEG_QUALITY}
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+    if image_format == 'GIF' and getattr(image, 'is_animated', False):
+        options = {**options, 'save_all': True}
+    image.info = {
+        key: value for key, value in image.info.items() if key in KEPT_INFO
+    }
+    if image.info.get('icc_profile'):
+        # Цветовой профиль - не личные данные, без него цвета поплывут.
+        options = {**options, 'icc_profile': image.info['icc_profile']}
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+    return Master(
+        ContentFile(buffer.getvalue(), name=name),
+        image.width, image.height, buffer.tell()
+    )
+
+
+class ImageIngestMixin:
+    """Подмешивается к ModelForm с полем image.
+
+    Новая загрузка заменяется мастером, а его размеры записываются в
+    image_width, image_height и image_bytes модели.
+    """
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            master = ingest(image)
+            image = master.file
+            self.instance.image_width = master.width
+            self.instance.image_height = master.height
+            self.instance.image_bytes = master.size
+        elif not image:
+            self.instance.image_width = None
+            self.instance.image_height = None
+            self.instance.image_bytes = None
+        return image
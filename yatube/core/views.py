@@ -1,4 +1,8 @@
+from django.conf import settings
 from django.shortcuts import render
+from django.views.static import serve
+
+from .storage import IMMUTABLE_NAME_RE
 
 
 def page_not_found(request, exception):
@@ -17,3 +21,13 @@ def permission_denied(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def media(request, path, document_root=None, show_indexes=False):
+    """django.views.static.serve с бессрочным кэшем для имён по хэшу."""
+    response = serve(request, path, document_root, show_indexes)
+    if response.status_code == 200 and IMMUTABLE_NAME_RE.search(path):
+        response['Cache-Control'] = (
+            f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable'
+        )
+    return response
@@ -1,15 +1,28 @@
 from django.contrib import admin
+from django.db import transaction
 
-from .models import Comment, Follow, Group, Post, Like
+from core.admin import FastAdminMixin, username_filter
 
+from .likes import forget_likes
+from .models import Comment, CommentLike, Follow, Group, Post, PostLike
+from .search import filter_matching
 
-class PostAdmin(admin.ModelAdmin):
+
+class PostAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group', 'image',)
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    list_filter = ('pub_date', username_filter('author', 'автору'))
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск через полнотекстовый индекс вместо LIKE по всей таблице.
+        if not search_term.strip():
+            return queryset, False
+        return filter_matching(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
@@ -17,26 +30,57 @@ class GroupAdmin(admin.ModelAdmin):
     list_filter = ('title',)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ('pk', 'post', 'text', 'author', 'pub_date')
-    search_fields = ('author',)
-    list_filter = ('author',)
+    list_select_related = ('post', 'author')
+    autocomplete_fields = ('post', 'author')
+    search_fields = ('text',)
+    list_filter = (username_filter('author', 'автору'),)
+
+
+class LikeAdminMixin:
+    """Удаление лайков со счётчиками.
+
+    У моделей лайков нет сигналов удаления (см. posts.signals).
+    """
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, type(obj).objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            forget_likes(queryset)
+            queryset.delete()
+
+
+class PostLikeAdmin(LikeAdminMixin, FastAdminMixin, admin.ModelAdmin):
+    list_display = ('pk', 'user', 'post')
+    list_select_related = ('user', 'post')
+    autocomplete_fields = ('user', 'post')
+    search_fields = ('=user__username',)
 
 
-class LikeAdmin(admin.ModelAdmin):
-    list_display = ('liked_by', 'content_type', 'object_id', 'content_object')
-    search_fields = ('liked_by',)
-    list_filter = ('liked_by',)
+class CommentLikeAdmin(LikeAdminMixin, FastAdminMixin, admin.ModelAdmin):
+    list_display = ('pk', 'user', 'comment')
+    list_select_related = ('user', 'comment')
+    autocomplete_fields = ('user', 'comment')
+    search_fields = ('=user__username',)
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = ('pk', 'user', 'author')
-    search_fields = ('author', 'user',)
-    list_filter = ('user', 'author',)
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    list_filter = (
+        username_filter('user', 'подписчику'),
+        username_filter('author', 'автору'),
+    )
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
-admin.site.register(Like, LikeAdmin)
+admin.site.register(PostLike, PostLikeAdmin)
+admin.site.register(CommentLike, CommentLikeAdmin)
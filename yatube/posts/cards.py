@@ -0,0 +1,68 @@
+"""Кэш отрисованных карточек постов для лент.
+
+Карточка кэшируется под версиями поста, его автора (имя, аватар) и
+группы (название) из posts.page_cache, так что правка, лайк,
+комментарий или переименование автора дают новый ключ. Лента
+собирается из карточек двумя запросами к кэшу: версии и сами
+карточки; отрисовываются только промахи. Состояние зрителя (лайкнул
+ли он пост) в кэш не попадает: на его месте в HTML стоит метка,
+которая подставляется при каждом показе.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core import thumbnails
+
+from .page_cache import get_versions
+
+# Метка в классе сердечка; заменяется на '-fill' для лайкнутых постов.
+LIKED_MARKER = '__viewer_liked__'
+
+CARD_FLAGS = ('group_flag', 'profile_flag')
+
+
+def card_scopes(post):
+    scopes = [f'post:{post.pk}', f'user:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'group_info:{post.group_id}')
+    return scopes
+
+
+def render_cards(posts, **flags):
+    """HTML карточек posts для ленты с флагами шаблона flags."""
+    posts = list(posts)
+    flags = {name: bool(flags.get(name)) for name in CARD_FLAGS}
+    flag_key = ''.join(str(int(value)) for value in flags.values())
+    scopes = [card_scopes(post) for post in posts]
+    versions = iter(get_versions(
+        [scope for post_scopes in scopes for scope in post_scopes]
+    ))
+    keys = [
+        'post_card:{}:{}:{}'.format(
+            post.pk, flag_key,
+            ':'.join(str(next(versions)) for _ in post_scopes)
+        )
+        for post, post_scopes in zip(posts, scopes)
+    ]
+    cached = cache.get_many(keys)
+    # Миниатюры нужны только отрисовываемым карточкам - находим их
+    # одним запросом на всю ленту.
+    thumbnails.attach(
+        post for post, key in zip(posts, keys) if key not in cached
+    )
+    missed = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        html = cached.get(key)
+        if html is None:
+            html = missed[key] = render_to_string(
+                'posts/includes/post_card.html',
+                {'post': post, 'liked_marker': LIKED_MARKER, **flags}
+            )
+        cards.append(html.replace(
+            LIKED_MARKER, '-fill' if getattr(post, 'liked', False) else ''
+        ))
+    if missed:
+        cache.set_many(missed, settings.FRAGMENT_CACHE_TIMEOUT)
+    return cards
@@ -0,0 +1,91 @@
+"""Условные GET-запросы (ETag / Last-Modified) для лент и постов.
+
+Валидаторы страницы строятся без отрисовки из версий posts.page_cache:
+не больше одного индексного запроса (найти группу, автора или пост) и
+одно чтение версий из кэша. Версия - время последнего изменения,
+поэтому наибольшая из них служит и Last-Modified. Для вошедшего
+пользователя в ETag входит маркер зрителя: его id и версии
+'viewer:<id>' (его лайки и подписки) и 'user:<id>' (имя в шапке).
+Всякому зрителю в ETag входит его CSRF-cookie: формы страницы несут
+выведенный из неё токен, и после смены cookie (вход, выход) старая
+копия из кэша браузера получила бы 403. Совпавший запрос получает
+304 Not Modified.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.utils.cache import patch_cache_control, quote_etag
+from django.views.decorators.http import condition
+
+from . import page_cache
+
+
+def viewer_scopes(user):
+    if not user.is_authenticated:
+        return []
+    return [f'viewer:{user.pk}', f'user:{user.pk}']
+
+
+def page_versions(request, get_scopes, args, kwargs):
+    """{scope: версия} страницы или None, если страницы нет.
+
+    Считается один раз на запрос: condition вызывает функции ETag и
+    Last-Modified по отдельности.
+    """
+    if not hasattr(request, '_page_versions'):
+        scopes = page_cache.request_scopes(
+            request, get_scopes, args, kwargs
+        )
+        if scopes is None:
+            request._page_versions = None
+        else:
+            scopes = [*scopes, *viewer_scopes(request.user)]
+            request._page_versions = dict(
+                zip(scopes, page_cache.get_versions(scopes))
+            )
+    return request._page_versions
+
+
+def conditional_page(get_scopes):
+    """Отвечает 304, если страница не менялась с версии у клиента.
+
+    get_scopes - как у page_cache.cache_anonymous_page.
+    """
+    def etag(request, *args, **kwargs):
+        versions = page_versions(request, get_scopes, args, kwargs)
+        if versions is None:
+            return None
+        raw = '|'.join(
+            [str(request.user.pk)]
+            + [request.META.get('CSRF_COOKIE', '')]
+            + [f'{scope}={versions[scope]}' for scope in sorted(versions)]
+        )
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        versions = page_versions(request, get_scopes, args, kwargs)
+        if not versions:
+            return None
+        # Версия не бывает больше текущего времени (см. page_cache.bump).
+        latest = min(max(versions.values()), page_cache.new_version())
+        return datetime.fromtimestamp(latest / 10 ** 9, tz=timezone.utc)
+
+    def decorator(view):
+        conditional_view = condition(etag, last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code == 200 and response.has_header('ETag'):
+                # Отрисовка могла выдать новую CSRF-cookie: тег
+                # считается по ней, как и следующий запрос клиента.
+                response['ETag'] = quote_etag(etag(request, *args, **kwargs))
+            # Браузер должен переспрашивать сервер, а не брать страницу
+            # из своего кэша по эвристике Last-Modified.
+            patch_cache_control(response, no_cache=True)
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,42 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, CommentLike, Post, PostLike
+
+
+def count_subquery(queryset, field, outer='pk', aggregate=None):
+    """Подзапрос с числом строк queryset, связанных с OuterRef(outer).
+
+    aggregate позволяет вместо Count('pk') взять, например, Sum по
+    уже денормализованному счётчику.
+    """
+    if aggregate is None:
+        aggregate = Count('pk')
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)}).order_by().values(
+                field
+            ).annotate(total=aggregate).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def increment(model, pk, field, delta=1):
+    """Атомарно меняет счётчик field объекта model с первичным ключом pk."""
+    objects = model.objects.filter(pk=pk)
+    if delta < 0:
+        objects = objects.filter(**{f'{field}__gte': -delta})
+    objects.update(**{field: F(field) + delta})
+
+
+def recount():
+    """Пересчитывает все счётчики одним UPDATE на каждую таблицу."""
+    Post.objects.update(
+        comments_count=count_subquery(Comment.objects.all(), 'post'),
+        likes_count=count_subquery(PostLike.objects.all(), 'post'),
+    )
+    Comment.objects.update(
+        likes_count=count_subquery(CommentLike.objects.all(), 'comment'),
+    )
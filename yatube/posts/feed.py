@@ -0,0 +1,136 @@
+"""Лента подписок с раздачей постов при записи (fan-out on write).
+
+Посты авторов с числом подписчиков не больше FEED_FANOUT_LIMIT
+раскладываются по FeedItem подписчиков в момент публикации.
+Посты «популярных» авторов не раздаются, а подтягиваются при чтении
+ленты (pull), чтобы один пост не порождал миллион вставок.
+
+Лента без таких авторов листается по FeedItem: сортировка и поиск по
+ключу идут по его индексу (user, -pub_date, -post), а посты
+подтягиваются по первичному ключу.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from core.caching import get_or_compute
+
+from . import follow_graph
+from .models import FeedItem, Follow, Post, UserStats
+
+PULLED_AUTHORS_KEY = 'feed:pulled_authors'
+
+# Ключ сортировки ленты подписок для posts_paginator: аннотации,
+# которые follow_feed ставит на посты.
+KEYS = ('feed_date', 'feed_post')
+
+
+def pulled_authors():
+    """Множество id авторов, чьи посты читаются через pull."""
+    return get_or_compute(
+        PULLED_AUTHORS_KEY,
+        lambda: set(UserStats.objects.filter(
+            followers_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('user_id', flat=True)),
+        settings.FEED_PULLED_TIMEOUT, name='pulled_authors'
+    )
+
+
+def is_pulled(author_id):
+    return author_id in pulled_authors()
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Возвращает id получателей или пустой список, если автор
+    читается через pull.
+    """
+    if is_pulled(post.author_id):
+        return []
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    FeedItem.objects.bulk_create(
+        (
+            FeedItem(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ),
+        ignore_conflicts=True
+    )
+    return followers
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    if is_pulled(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_LIMIT]
+    FeedItem.objects.bulk_create(
+        (
+            FeedItem(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ),
+        ignore_conflicts=True
+    )
+
+
+def resume_fan_out(author_id):
+    """Возвращает автора из pull в раздачу при записи.
+
+    Пока автор был популярным, его посты в ленты не раскладывались:
+    последние FEED_BACKFILL_LIMIT из них добавляются всем подписчикам.
+    Кэш популярных сбрасывается до раздачи, чтобы новые посты автора
+    уже раздавались сами.
+    """
+    cache.delete(PULLED_AUTHORS_KEY)
+    followers = list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True))
+    posts = list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_LIMIT])
+    FeedItem.objects.bulk_create(
+        (
+            FeedItem(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for user_id in followers
+            for pk, pub_date in posts
+        ),
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+    return followers
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты подписчика посты автора после отписки."""
+    FeedItem.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def follow_feed(user):
+    """Посты ленты подписок пользователя с ключом KEYS.
+
+    Обычно это проход по его FeedItem, и ключ берётся из FeedItem
+    (annotate переиспользует соединение из filter). Посты популярных
+    авторов, на которых он подписан, добавляются условием по
+    author_id, и тогда ключ - поля самого поста.
+    """
+    pulled = pulled_authors()
+    if pulled:
+        pulled = [
+            author_id for author_id in follow_graph.followed_ids(user)
+            if author_id in pulled
+        ]
+    if not pulled:
+        return Post.objects.filter(feed_items__user=user).annotate(
+            feed_date=F('feed_items__pub_date'),
+            feed_post=F('feed_items__post'),
+        )
+    return Post.objects.filter(
+        Q(pk__in=FeedItem.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=pulled)
+    ).annotate(feed_date=F('pub_date'), feed_post=F('pk'))
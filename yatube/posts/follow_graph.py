@@ -0,0 +1,45 @@
+"""Граф подписок в общем кэше.
+
+Для каждого пользователя хранится отсортированный массив id авторов,
+на которых он подписан (array('l') - компактнее списка объектов int).
+Запись сбрасывается сигналами при создании и удалении Follow, поэтому
+на «тёплом» пути проверки подписки не обращаются к базе.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Follow
+
+
+def graph_key(user_id):
+    return f'follow_graph:{user_id}'
+
+
+def followed_ids(user):
+    """Отсортированный массив id авторов, на которых подписан user."""
+    if not user.is_authenticated:
+        return array('l')
+    key = graph_key(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = array('l', Follow.objects.filter(user=user).order_by(
+            'author_id'
+        ).values_list('author_id', flat=True).distinct())
+        cache.set(key, ids, settings.FOLLOW_GRAPH_TIMEOUT)
+    return ids
+
+
+def contains(ids, author_id):
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
+
+
+def is_following(user, author):
+    return contains(followed_ids(user), author.pk)
+
+
+def invalidate(user_id):
+    cache.delete(graph_key(user_id))
@@ -1,9 +1,11 @@
 from django import forms
 
+from core.uploads import ImageIngestMixin
+
 from .models import Post, Comment
 
 
-class PostForm(forms.ModelForm):
+class PostForm(ImageIngestMixin, forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -0,0 +1,117 @@
+from collections import Counter
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+
+from . import page_cache
+from .counters import increment
+from .models import Comment, CommentLike, Post, PostLike, UserStats
+
+# Модель лайка и имя поля-цели для каждой лайкаемой модели.
+LIKE_MODELS = {
+    Post: (PostLike, 'post'),
+    Comment: (CommentLike, 'comment'),
+}
+
+# Обратное соответствие: лайкаемая модель и поле-цель модели лайка.
+LIKE_TARGETS = {
+    like_model: (model, field)
+    for model, (like_model, field) in LIKE_MODELS.items()
+}
+
+
+def change_likes(model, pk, author_id, user_id, delta):
+    """Меняет счётчик лайков объекта и полученные лайки его автора.
+
+    user_id - кто поставил или снял лайк: у него меняется маркер
+    зрителя (posts.conditional).
+    """
+    increment(model, pk, 'likes_count', delta)
+    if author_id is not None:
+        increment(UserStats, author_id, 'likes_received', delta)
+    if model is Post:
+        page_cache.bump_post(pk)
+    else:
+        page_cache.bump_comment(pk)
+    page_cache.bump(f'viewer:{user_id}')
+
+
+def toggle_like(target, user):
+    """Ставит или снимает лайк user на target (пост или комментарий).
+
+    Два простых запроса в одной транзакции: DELETE по уникальному
+    индексу (target, user) и, если удалять было нечего, INSERT.
+    Повторный параллельный клик упирается в тот же индекс и не создаёт
+    дубль. Сигналы не отправляются, счётчики меняются здесь же.
+    Возвращает True, если лайк поставлен.
+    """
+    model = type(target)
+    like_model, field = LIKE_MODELS[model]
+    table = connection.ops.quote_name(like_model._meta.db_table)
+    column = connection.ops.quote_name(
+        like_model._meta.get_field(field).column
+    )
+    params = (target.pk, user.pk)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {column} = %s AND user_id = %s',
+            params
+        )
+        if cursor.rowcount:
+            change_likes(model, target.pk, target.author_id, user.pk, -1)
+            return False
+        try:
+            with transaction.atomic():
+                cursor.execute(
+                    f'INSERT INTO {table} ({column}, user_id) '
+                    f'VALUES (%s, %s)',
+                    params
+                )
+        except IntegrityError:
+            return True
+        change_likes(model, target.pk, target.author_id, user.pk, 1)
+        return True
+
+
+def forget_likes(likes, targets_deleted=False):
+    """Меняет счётчики перед удалением лайков likes, пачкой.
+
+    Один запрос группирует лайки по объекту и его автору, ещё один
+    собирает лайкнувших; счётчики меняются одним UPDATE на объект и
+    на автора. targets_deleted - объекты удаляются вместе с лайками,
+    и их собственные счётчики не трогаются.
+    """
+    model, field = LIKE_TARGETS[likes.model]
+    # Пост в группе или пост комментария - для версий страниц.
+    parent = 'group' if model is Post else 'post'
+    likes = likes.order_by()
+    rows = likes.values_list(
+        field, f'{field}__author', f'{field}__{parent}'
+    ).annotate(total=Count('pk'))
+    received = Counter()
+    scopes = []
+    for pk, author_id, parent_id, total in rows:
+        received[author_id] += total
+        if not targets_deleted:
+            increment(model, pk, 'likes_count', -total)
+        if model is Post:
+            scopes.extend(page_cache.post_scopes(pk, author_id, parent_id))
+        else:
+            scopes.extend((f'post:{parent_id}', f'author:{author_id}'))
+    for author_id, total in received.items():
+        increment(UserStats, author_id, 'likes_received', -total)
+    page_cache.bump(*scopes, *(
+        f'viewer:{user_id}'
+        for user_id in likes.values_list('user_id', flat=True).distinct()
+    ))
+
+
+def liked_ids(user, model, objects):
+    """id объектов из objects, которые лайкнул user, одним запросом."""
+    ids = [obj.pk for obj in objects]
+    if not ids:
+        return set()
+    like_model, field = LIKE_MODELS[model]
+    return set(like_model.objects.filter(
+        user=user, **{f'{field}_id__in': ids}
+    ).values_list(f'{field}_id', flat=True))
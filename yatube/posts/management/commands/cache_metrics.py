@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.caching import EVENTS, get_metrics
+
+
+class Command(BaseCommand):
+    help = 'Показывает метрики чтения кэша по всем процессам.'
+
+    def handle(self, *args, **options):
+        metrics = get_metrics()
+        if not metrics:
+            self.stdout.write('Метрик пока нет.')
+            return
+        self.stdout.write(' '.join(['name'.ljust(16), *EVENTS]))
+        for name, values in metrics.items():
+            self.stdout.write(' '.join(
+                [name.ljust(16)]
+                + [str(values[event]).rjust(len(event)) for event in EVENTS]
+            ))
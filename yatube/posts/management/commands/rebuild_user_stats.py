@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает статистику пользователей для карточки автора.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'user_ids', nargs='*', type=int,
+            help='id пользователей; по умолчанию - все.'
+        )
+
+    def handle(self, *args, **options):
+        rebuild(options['user_ids'] or None)
+        self.stdout.write(self.style.SUCCESS('Статистика пересобрана.'))
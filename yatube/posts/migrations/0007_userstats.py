@@ -0,0 +1,79 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_subquery(queryset, field, outer='pk', aggregate=None):
+    if aggregate is None:
+        aggregate = Count('pk')
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)}).order_by().values(
+                field
+            ).annotate(total=aggregate).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def fill_stats(apps, schema_editor):
+    """Заводит статистику всем пользователям, как posts.stats.rebuild."""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=pk)
+            for pk in User.objects.values_list('pk', flat=True).iterator()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+    UserStats.objects.update(
+        posts_count=count_subquery(Post.objects.all(), 'author', 'user'),
+        followers_count=count_subquery(
+            Follow.objects.all(), 'author', 'user'
+        ),
+        following_count=count_subquery(Follow.objects.all(), 'user', 'user'),
+        likes_received=(
+            count_subquery(
+                Post.objects.all(), 'author', 'user', Sum('likes_count')
+            )
+            + count_subquery(
+                Comment.objects.all(), 'author', 'user', Sum('likes_count')
+            )
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0006_post_comment_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+                ('likes_received', models.PositiveIntegerField(default=0, verbose_name='Получено лайков')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
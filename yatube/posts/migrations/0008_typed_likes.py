@@ -0,0 +1,112 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:26
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_subquery(queryset, field, outer='pk', aggregate=None):
+    if aggregate is None:
+        aggregate = Count('pk')
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)}).order_by().values(
+                field
+            ).annotate(total=aggregate).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def copy_likes(apps, schema_editor):
+    """Переносит лайки из обобщённой Like в PostLike и CommentLike.
+
+    Дубли, которые могла наплодить старая схема, отбрасываются
+    уникальным индексом, поэтому счётчики из 0006 и likes_received
+    из 0007 пересчитываются по новым таблицам.
+    """
+    Like = apps.get_model('posts', 'Like')
+    targets = (
+        ('post', apps.get_model('posts', 'PostLike')),
+        ('comment', apps.get_model('posts', 'CommentLike')),
+    )
+    for model_name, like_model in targets:
+        likes = Like.objects.filter(
+            content_type__app_label='posts',
+            content_type__model=model_name
+        ).values_list('object_id', 'liked_by_id')
+        like_model.objects.bulk_create(
+            (
+                like_model(**{
+                    f'{model_name}_id': object_id, 'user_id': user_id
+                })
+                for object_id, user_id in likes.iterator()
+            ),
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        apps.get_model('posts', model_name).objects.update(
+            likes_count=count_subquery(like_model.objects.all(), model_name)
+        )
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    apps.get_model('posts', 'UserStats').objects.update(
+        likes_received=(
+            count_subquery(
+                Post.objects.all(), 'author', 'user', Sum('likes_count')
+            )
+            + count_subquery(
+                Comment.objects.all(), 'author', 'user', Sum('likes_count')
+            )
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0007_userstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentLike',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='posts.Comment', verbose_name='Комментарий')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_likes', to=settings.AUTH_USER_MODEL, verbose_name='Кто лайкнул')),
+            ],
+            options={
+                'verbose_name': 'Лайк комментария',
+                'verbose_name_plural': 'Лайки комментариев',
+            },
+        ),
+        migrations.CreateModel(
+            name='PostLike',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_likes', to=settings.AUTH_USER_MODEL, verbose_name='Кто лайкнул')),
+            ],
+            options={
+                'verbose_name': 'Лайк поста',
+                'verbose_name_plural': 'Лайки постов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='postlike',
+            constraint=models.UniqueConstraint(fields=('post', 'user'), name='unique_post_like'),
+        ),
+        migrations.AddConstraint(
+            model_name='commentlike',
+            constraint=models.UniqueConstraint(fields=('comment', 'user'), name='unique_comment_like'),
+        ),
+        migrations.RunPython(copy_likes, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='Like',
+        ),
+    ]
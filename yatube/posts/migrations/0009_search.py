@@ -0,0 +1,81 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:29
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.utils import OperationalError
+
+
+def create_fts(apps, schema_editor):
+    """Создаёт и заполняет таблицу SQLite FTS5 для поиска по постам.
+
+    Если FTS5 недоступен (не SQLite или сборка без модуля), посты
+    индексируются в SearchTerm.
+    """
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                'CREATE VIRTUAL TABLE posts_post_fts '
+                'USING fts5(text, grp, author)'
+            )
+        except OperationalError:
+            pass
+        else:
+            schema_editor.execute(
+                'INSERT INTO posts_post_fts (rowid, text, grp, author) '
+                "SELECT p.id, p.text, COALESCE(g.title, ''), u.username "
+                'FROM posts_post p '
+                'LEFT JOIN posts_group g ON g.id = p.group_id '
+                'JOIN users_user u ON u.id = p.author_id'
+            )
+            return
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    posts = Post.objects.values_list(
+        'pk', 'text', 'group__title', 'author__username'
+    )
+    SearchTerm.objects.bulk_create(
+        (
+            SearchTerm(term=term[:64], post_id=pk)
+            for pk, *texts in posts.iterator()
+            for term in set(re.findall(r'\w+', ' '.join(
+                text or '' for text in texts
+            ).lower()))
+        ),
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_typed_likes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -1,6 +1,3 @@
-from django.contrib.contenttypes.fields import GenericForeignKey
-from django.contrib.contenttypes.fields import GenericRelation
-from django.contrib.contenttypes.models import ContentType
 from django.db import models
 
 from core.models import CreatedModel, User
@@ -19,17 +16,29 @@ class Group(models.Model):
         return self.title
 
 
-class Like(models.Model):
-    liked_by = models.ForeignKey(
-        User,
-        on_delete=models.CASCADE,
-        related_name='liker')
-    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.PositiveIntegerField()
-    content_object = GenericForeignKey()
+class CountersMixin(models.Model):
+    """Не даёт обычному save() затереть счётчики устаревшими значениями.
+
+    Счётчики меняются только атомарными UPDATE ... SET x = x + 1
+    (см. posts.signals), поэтому при сохранении уже существующего
+    объекта они исключаются из update_fields.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
 
 
-class Post(CreatedModel):
+class Post(CountersMixin, CreatedModel):
     group = models.ForeignKey(
         Group,
         blank=True,
@@ -44,15 +53,55 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True
     )
-    likes = GenericRelation(Like, related_query_name='posts')
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        editable=False
+    )
+    image_bytes = models.PositiveIntegerField(
+        'Размер картинки в байтах',
+        null=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+    likes_count = models.PositiveIntegerField(
+        'Число лайков',
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('comments_count', 'likes_count')
 
     class Meta(CreatedModel.Meta):
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         default_related_name = 'posts'
+        # Индексы под пагинацию по ключу (pub_date, id) в каждой ленте.
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='post_feed_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_feed_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx'
+            ),
+        )
 
 
-class Comment(CreatedModel):
+class Comment(CountersMixin, CreatedModel):
     post = models.ForeignKey(
         Post,
         blank=True,
@@ -62,7 +111,13 @@ class Comment(CreatedModel):
         verbose_name="Комментируемый пост",
         help_text='Введите комментарий'
     )
-    likes = GenericRelation(Like, related_query_name='comments')
+    likes_count = models.PositiveIntegerField(
+        'Число лайков',
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('likes_count',)
 
     class Meta(CreatedModel.Meta):
         verbose_name = 'Комментарий'
@@ -70,6 +125,63 @@ class Comment(CreatedModel):
         default_related_name = 'comments'
 
 
+class PostLike(models.Model):
+    """Лайк поста. Уникальный индекс (post, user) исключает дубли
+    и позволяет считать лайки только по индексу."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name="Пост"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='post_likes',
+        verbose_name="Кто лайкнул"
+    )
+
+    class Meta:
+        verbose_name = 'Лайк поста'
+        verbose_name_plural = 'Лайки постов'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('post', 'user'), name='unique_post_like'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.user_id} лайкнул пост {self.post_id}'
+
+
+class CommentLike(models.Model):
+    """Лайк комментария с уникальным индексом (comment, user)."""
+    comment = models.ForeignKey(
+        Comment,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name="Комментарий"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='comment_likes',
+        verbose_name="Кто лайкнул"
+    )
+
+    class Meta:
+        verbose_name = 'Лайк комментария'
+        verbose_name_plural = 'Лайки комментариев'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('comment', 'user'), name='unique_comment_like'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.user_id} лайкнул комментарий {self.comment_id}'
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -90,3 +202,97 @@ class Follow(models.Model):
 
     def __str__(self) -> str:
         return str(f'{self.user} подписан на {self.author}')
+
+
+class FeedItem(models.Model):
+    """Запись во «входящей» ленте подписчика.
+
+    Заполняется при публикации поста (fan-out on write), поэтому
+    лента подписок читается одним проходом по индексу
+    (user, pub_date) без соединения через Follow.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name="Подписчик"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name="Пост"
+    )
+    pub_date = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        unique_together = ('user', 'post')
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='feeditem_user_feed_idx'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.post_id} в ленте {self.user_id}'
+
+
+class UserStats(models.Model):
+    """Заранее посчитанная статистика пользователя для user_card.
+
+    Поддерживается атомарными UPDATE в posts.signals, пересобирается
+    командой rebuild_user_stats.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name="Пользователь"
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0, db_index=True
+    )
+    following_count = models.PositiveIntegerField(
+        'Число подписок', default=0
+    )
+    likes_received = models.PositiveIntegerField(
+        'Получено лайков', default=0
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self) -> str:
+        return f'Статистика {self.user_id}'
+
+
+class SearchTerm(models.Model):
+    """Инвертированный индекс постов для баз без SQLite FTS5.
+
+    Слова текста поста, названия его группы и имени автора.
+    """
+    term = models.CharField('Слово', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name="Пост"
+    )
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('term', 'post'), name='unique_search_term'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return self.term
@@ -0,0 +1,222 @@
+"""Кэш целых страниц для анонимных читателей.
+
+Ключ страницы собирается из её адреса и версий всего, что на ней
+показано: 'index', 'group:<id>', 'author:<id>', 'post:<id>'. Карточки
+постов (posts.cards) зависят ещё от 'user:<id>' (имя и аватар) и
+'group_info:<id>' (название группы). Сигналы
+(posts.signals) увеличивают версии при записи, после чего следующие
+запросы просто не находят старый ключ, а устаревшие страницы уходят
+из кэша сами. Поэтому страницы живут без таймаута, пока не изменится
+то, от чего они зависят. Те же версии использует тег
+{% generation_cache %} для фрагментов страниц, а posts.conditional -
+для ETag и Last-Modified.
+
+Версия - время последнего изменения в наносекундах: bump не просто
+прибавляет единицу, а сдвигает версию к текущему времени.
+
+Рядом с ключом по версиям хранится последняя удачная копия страницы
+по одному адресу (stale_page_key): пока после записи новую версию
+отрисовывает один запрос, остальные получают её.
+"""
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core.caching import get_or_compute
+
+from . import follow_graph
+from .models import Comment, Group, Post, User
+
+# Параметры запроса, от которых зависят кэшируемые страницы.
+PAGE_CACHE_PARAMS = ('page', 'cursor')
+
+
+def version_key(scope):
+    return f'page_version:{scope}'
+
+
+def new_version():
+    # Версия после вытеснения из кэша не должна совпасть с прежней,
+    # иначе снова станут видны старые страницы.
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, 0) for key in keys]
+
+
+def bump(*scopes):
+    """Делает недействительными страницы, зависящие от scopes."""
+    keys = [version_key(scope) for scope in set(scopes)]
+    current = cache.get_many(keys)
+    for key in keys:
+        now = new_version()
+        # incr атомарен: параллельные bump не потеряют друг друга,
+        # а версия не станет меньше текущего времени.
+        try:
+            cache.incr(key, max(1, now - current.get(key, now)))
+        except ValueError:
+            cache.set(key, now, None)
+
+
+def post_scopes(post_id, author_id, group_id):
+    """Версии, от которых зависят страницы с карточкой поста."""
+    scopes = ['index', f'post:{post_id}', f'author:{author_id}']
+    if group_id:
+        scopes.append(f'group:{group_id}')
+    return scopes
+
+
+def bump_post(post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        bump(*post_scopes(post_id, *post))
+
+
+def bump_comment(comment_id):
+    """Пост с комментарием и профиль автора комментария."""
+    comment = Comment.objects.filter(pk=comment_id).values_list(
+        'post_id', 'author_id'
+    ).first()
+    if comment is not None:
+        post_id, author_id = comment
+        bump(f'post:{post_id}', f'author:{author_id}')
+
+
+def page_address(request):
+    """Путь и параметры из PAGE_CACHE_PARAMS.
+
+    Прочие параметры (utm-метки, ?_=...) страницу не меняют; иначе
+    каждый их вариант занимал бы в кэше свою копию.
+    """
+    params = sorted(
+        (name, value) for name, values in request.GET.lists()
+        if name in PAGE_CACHE_PARAMS for value in values
+    )
+    return f'{request.path}?{urlencode(params)}'
+
+
+def page_key(request, scopes):
+    """Ключ страницы: адрес и версии scopes."""
+    raw = '|'.join(
+        [page_address(request)]
+        + [
+            f'{scope}={version}'
+            for scope, version in zip(scopes, get_versions(scopes))
+        ]
+    )
+    return 'page:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def stale_page_key(request):
+    """Последняя удачная версия страницы для stale-while-revalidate."""
+    raw = page_address(request)
+    return 'page_stale:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def index_scopes(request):
+    return ['index']
+
+
+def group_scopes(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    return None if group_id is None else [f'group:{group_id}']
+
+
+def profile_scopes(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    return None if author_id is None else [f'author:{author_id}']
+
+
+def post_detail_scopes(request, post_id):
+    """Пост, его автор и название группы - без 'index' и 'group:<id>'.
+
+    Страница поста не показывает ленты, поэтому новые посты и лайки
+    в них её не трогают.
+    """
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if post is None:
+        return None
+    author_id, group_id = post
+    scopes = [f'post:{post_id}', f'author:{author_id}']
+    if group_id:
+        scopes.append(f'group_info:{group_id}')
+    return scopes
+
+
+def follow_scopes(request):
+    """Лента подписок зависит от всех авторов, на которых подписан зритель."""
+    return [
+        f'author:{author_id}'
+        for author_id in follow_graph.followed_ids(request.user)
+    ]
+
+
+def request_scopes(request, get_scopes, args, kwargs):
+    """get_scopes для запроса, вычисленные один раз на запрос."""
+    scopes = getattr(request, '_page_scopes', None)
+    if scopes is None:
+        scopes = request._page_scopes = {}
+    if get_scopes not in scopes:
+        scopes[get_scopes] = get_scopes(request, *args, **kwargs)
+    return scopes[get_scopes]
+
+
+def cache_anonymous_page(get_scopes):
+    """Кэширует ответ view для анонимов по версиям get_scopes.
+
+    get_scopes вызывается с теми же аргументами, что и view.
+    get_scopes возвращает None, если страницы нет, - тогда ответ
+    не кэшируется.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            scopes = request_scopes(request, get_scopes, args, kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            key = page_key(request, scopes)
+            rendered = []
+
+            def render():
+                response = view(request, *args, **kwargs)
+                rendered.append(response)
+                if response.status_code != 200 or response.streaming:
+                    return None
+                return response.content, response['Content-Type']
+
+            cached = get_or_compute(
+                key, render, settings.PAGE_CACHE_TIMEOUT, name='page',
+                stale_key=stale_page_key(request)
+            )
+            if rendered:
+                return rendered[0]
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        return wrapper
+    return decorator
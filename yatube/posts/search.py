@@ -0,0 +1,224 @@
+"""Полнотекстовый поиск по постам.
+
+Ищет по тексту поста, названию группы и имени автора. На SQLite с
+FTS5 используется виртуальная таблица posts_post_fts с ранжированием
+bm25; иначе - инвертированный индекс SearchTerm, где пост тем выше,
+чем больше слов запроса в нём нашлось. Индекс обновляется сигналами
+(posts.signals) при сохранении и удалении постов, групп и авторов.
+"""
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.db.models import Count, Q
+from django.utils.encoding import force_bytes, force_text
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .models import Post, SearchTerm
+
+FTS_TABLE = 'posts_post_fts'
+
+WORD_RE = re.compile(r'\w+')
+
+Hit = namedtuple('Hit', ('rank', 'post_id'))
+
+# Есть ли таблица FTS в базе: имя базы -> bool. Таблица появляется
+# только миграцией, так что проверять её на каждый запрос незачем.
+_fts_tables = {}
+
+
+def tokenize(*texts):
+    """Слова текстов в нижнем регистре, как их режет unicode61 в FTS5."""
+    terms = set()
+    for text in texts:
+        terms.update(
+            word[:SearchTerm._meta.get_field('term').max_length]
+            for word in WORD_RE.findall((text or '').lower())
+        )
+    return terms
+
+
+def fts_available():
+    """Есть ли в базе таблица FTS5 и разрешено ли ею пользоваться."""
+    if not settings.SEARCH_USE_FTS or connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        _fts_tables[name] = (
+            FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[name]
+
+
+def fts_query(terms):
+    # Каждое слово в кавычках: пользовательский ввод не станет
+    # синтаксисом MATCH.
+    return ' OR '.join('"{}"'.format(term.replace('"', '')) for term in terms)
+
+
+def index_posts(posts):
+    """Заново индексирует посты (queryset или список id)."""
+    posts = Post.objects.filter(pk__in=posts).values_list(
+        'pk', 'text', 'group__title', 'author__username'
+    )
+    if fts_available():
+        rows = list(posts)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(row[0],) for row in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, grp, author) '
+                'VALUES (%s, %s, %s, %s)',
+                [
+                    (pk, text, group or '', author)
+                    for pk, text, group, author in rows
+                ]
+            )
+        return
+    terms = []
+    post_ids = []
+    for pk, text, group, author in posts:
+        post_ids.append(pk)
+        terms.extend(
+            SearchTerm(term=term, post_id=pk)
+            for term in tokenize(text, group, author)
+        )
+    SearchTerm.objects.filter(post_id__in=post_ids).delete()
+    SearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def unindex_post(post_id):
+    """Убирает пост из FTS; SearchTerm удаляется каскадом."""
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+
+def rebuild():
+    """Полностью пересобирает активный поисковый индекс."""
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text, grp, author) '
+                'SELECT p.id, p.text, COALESCE(g.title, \'\'), u.username '
+                'FROM posts_post p '
+                'LEFT JOIN posts_group g ON g.id = p.group_id '
+                'JOIN users_user u ON u.id = p.author_id'
+            )
+        return
+    SearchTerm.objects.all().delete()
+    post_ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+    batch = []
+    for pk in post_ids.iterator():
+        batch.append(pk)
+        if len(batch) == 1000:
+            index_posts(batch)
+            batch = []
+    index_posts(batch)
+
+
+def filter_matching(queryset, query):
+    """Оставляет в queryset постов только подходящие под query."""
+    terms = tokenize(query)
+    if not terms:
+        return queryset.none()
+    if fts_available():
+        # RawSQL в pk__in SQLite понимает как скалярный подзапрос
+        # (IN ((SELECT ...))) и берёт из него одну строку.
+        return queryset.extra(
+            where=[
+                f'{Post._meta.db_table}.id IN (SELECT rowid FROM '
+                f'{FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'
+            ],
+            params=[fts_query(terms)]
+        )
+    return queryset.filter(
+        pk__in=SearchTerm.objects.filter(term__in=terms).values('post_id')
+    )
+
+
+def encode_cursor(hit):
+    return urlsafe_base64_encode(force_bytes(f'{hit.rank!r}|{hit.post_id}'))
+
+
+def decode_cursor(token):
+    try:
+        rank, post_id = force_text(urlsafe_base64_decode(token)).split('|')
+        return Hit(float(rank), int(post_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def ranked_hits(query, after=None, limit=None):
+    """До limit лучших совпадений после позиции after.
+
+    Порядок - (rank, post_id) по возрастанию: меньший rank
+    соответствует лучшему совпадению.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+    if fts_available():
+        sql = (
+            f'SELECT rank, post_id FROM ('
+            f'SELECT rank, rowid AS post_id FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        )
+        params = [fts_query(terms)]
+        if after is not None:
+            sql += ' WHERE rank > %s OR (rank = %s AND post_id > %s)'
+            params += [after.rank, after.rank, after.post_id]
+        sql += ' ORDER BY rank, post_id LIMIT %s'
+        params.append(limit)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                return [Hit(*row) for row in cursor.fetchall()]
+        except OperationalError:
+            return []
+    hits = SearchTerm.objects.filter(term__in=terms).values(
+        'post_id'
+    ).annotate(matches=Count('term')).order_by('-matches', 'post_id')
+    if after is not None:
+        matches = int(-after.rank)
+        hits = hits.filter(
+            Q(matches__lt=matches)
+            | Q(matches=matches, post_id__gt=after.post_id)
+        )
+    return [
+        Hit(-float(hit['matches']), hit['post_id']) for hit in hits[:limit]
+    ]
+
+
+class SearchResults:
+    """Страница результатов поиска с курсором на следующую страницу."""
+
+    def __init__(self, query, cursor=None, per_page=None):
+        per_page = per_page or settings.COUNT_POSTS
+        self.query = query
+        after = decode_cursor(cursor) if cursor else None
+        self.is_first = after is None
+        hits = ranked_hits(query, after, per_page + 1)
+        self.next_cursor = (
+            encode_cursor(hits[per_page - 1]) if len(hits) > per_page
+            else None
+        )
+        hits = hits[:per_page]
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [hit.post_id for hit in hits]
+        )
+        self.object_list = [
+            posts[hit.post_id] for hit in hits if hit.post_id in posts
+        ]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
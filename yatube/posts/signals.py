@@ -0,0 +1,294 @@
+from django.conf import settings
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from core import thumbnails
+from core.storage import release_file
+
+from . import feed, follow_graph, page_cache, search
+from .counters import increment
+from .likes import change_likes, forget_likes
+from .models import (
+    Comment, CommentLike, Follow, Group, Post, PostLike, User, UserStats
+)
+from .utils import invalidate_feed_counts
+
+
+# Поля пользователя, которые выводятся на страницах.
+USER_CARD_FIELDS = {'username', 'first_name', 'last_name', 'image'}
+
+
+def post_feeds(post):
+    """Имена лент, в число постов которых входит post."""
+    feeds = ['index', f'author:{post.author_id}']
+    if post.group_id:
+        feeds.append(f'group:{post.group_id}')
+    return feeds
+
+
+def image_uploaded(instance):
+    """Будет ли при сохранении записан новый файл картинки."""
+    return bool(instance.image) and not instance.image._committed
+
+
+def release_replaced_image(instance):
+    """Снимает ссылку на прежнюю картинку, если её заменили.
+
+    Повторная загрузка того же содержимого даёт то же имя, но хранилище
+    уже прибавило ссылку, поэтому прежняя снимается и тогда.
+    """
+    if instance._old_image != instance.image.name or instance._image_uploaded:
+        release_file(instance._old_image)
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_group(sender, instance, **kwargs):
+    instance._image_uploaded = image_uploaded(instance)
+    if instance.pk is None:
+        instance._old_group_id, instance._old_image = None, ''
+        return
+    instance._old_group_id, instance._old_image = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group_id', 'image').first() or (None, '')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if created:
+        increment(UserStats, instance.author_id, 'posts_count')
+        # Ленты популярных авторов (без раздачи) устаревают по таймауту.
+        followers = feed.fan_out(instance)
+        invalidate_feed_counts(
+            *post_feeds(instance),
+            *(f'follow:{user_id}' for user_id in followers)
+        )
+    elif old_group_id != instance.group_id:
+        feeds = [f'group:{old_group_id}', f'group:{instance.group_id}']
+        invalidate_feed_counts(*feeds)
+    release_replaced_image(instance)
+    search.index_posts([instance.pk])
+    page_cache.bump(
+        *page_cache.post_scopes(
+            instance.pk, instance.author_id, instance.group_id
+        ),
+        *([f'group:{old_group_id}'] if old_group_id else [])
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    increment(UserStats, instance.author_id, 'posts_count', -1)
+    feeds = post_feeds(instance)
+    if not feed.is_pulled(instance.author_id):
+        followers = Follow.objects.filter(
+            author_id=instance.author_id
+        ).values_list('user_id', flat=True)
+        feeds.extend(f'follow:{user_id}' for user_id in followers)
+    invalidate_feed_counts(*feeds)
+    search.unindex_post(instance.pk)
+    release_file(instance.image.name)
+    page_cache.bump(*page_cache.post_scopes(
+        instance.pk, instance.author_id, instance.group_id
+    ))
+
+
+@receiver(pre_save, sender=Group)
+def remember_old_title(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._old_title = instance.title
+        return
+    instance._old_title = Group.objects.filter(
+        pk=instance.pk
+    ).values_list('title', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    if instance._old_title != instance.title:
+        search.index_posts(instance.posts.values('pk'))
+    # Название группы есть в карточках постов на главной и в профилях.
+    page_cache.bump(
+        'index', f'group:{instance.pk}', f'group_info:{instance.pk}',
+        *(f'author:{author_id}' for author_id in group_authors(instance))
+    )
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    page_cache.bump(
+        'index', f'group:{instance.pk}', f'group_info:{instance.pk}',
+        *(f'author:{author_id}' for author_id in group_authors(instance))
+    )
+
+
+def resume_fan_out(author_id):
+    """Возвращает автора в раздачу, если подписчиков стало мало."""
+    followers_count = UserStats.objects.filter(
+        pk=author_id
+    ).values_list('followers_count', flat=True).first()
+    if (followers_count or 0) > settings.FEED_FANOUT_LIMIT:
+        return
+    followers = feed.resume_fan_out(author_id)
+    invalidate_feed_counts(*(f'follow:{user_id}' for user_id in followers))
+    page_cache.bump(f'author:{author_id}')
+
+
+def group_authors(group):
+    return group.posts.order_by().values_list(
+        'author_id', flat=True
+    ).distinct()
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance.user_id, instance.author_id)
+        increment(UserStats, instance.author_id, 'followers_count')
+        increment(UserStats, instance.user_id, 'following_count')
+        follow_graph.invalidate(instance.user_id)
+        page_cache.bump(
+            f'author:{instance.author_id}', f'author:{instance.user_id}',
+            f'viewer:{instance.user_id}'
+        )
+    invalidate_feed_counts(f'follow:{instance.user_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    feed.prune(instance.user_id, instance.author_id)
+    increment(UserStats, instance.author_id, 'followers_count', -1)
+    if feed.is_pulled(instance.author_id):
+        resume_fan_out(instance.author_id)
+    increment(UserStats, instance.user_id, 'following_count', -1)
+    follow_graph.invalidate(instance.user_id)
+    invalidate_feed_counts(f'follow:{instance.user_id}')
+    page_cache.bump(
+        f'author:{instance.author_id}', f'author:{instance.user_id}',
+        f'viewer:{instance.user_id}'
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created and instance.post_id:
+        increment(Post, instance.post_id, 'comments_count')
+    page_cache.bump_post(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id:
+        increment(Post, instance.post_id, 'comments_count', -1)
+        page_cache.bump_post(instance.post_id)
+
+
+def like_target(like):
+    """Модель, id и автор объекта, к которому относится лайк."""
+    if isinstance(like, PostLike):
+        model, pk = Post, like.post_id
+    else:
+        model, pk = Comment, like.comment_id
+    author_id = model.objects.filter(pk=pk).values_list(
+        'author_id', flat=True
+    ).first()
+    return model, pk, author_id
+
+
+@receiver(post_save, sender=PostLike)
+@receiver(post_save, sender=CommentLike)
+def like_saved(sender, instance, created, **kwargs):
+    if created:
+        change_likes(*like_target(instance), instance.user_id, 1)
+
+
+# У моделей лайков нет обработчиков удаления: при удалении поста,
+# комментария или пользователя Django стирает их лайки одним DELETE,
+# а счётчики меняются пачкой здесь, пока лайки ещё в базе.
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    forget_likes(PostLike.objects.filter(post=instance), targets_deleted=True)
+
+
+@receiver(pre_delete, sender=Comment)
+def comment_deleting(sender, instance, **kwargs):
+    forget_likes(
+        CommentLike.objects.filter(comment=instance), targets_deleted=True
+    )
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    forget_likes(PostLike.objects.filter(user=instance))
+    forget_likes(CommentLike.objects.filter(user=instance))
+
+
+@receiver(pre_save, sender=User)
+def remember_old_user(sender, instance, update_fields=None, **kwargs):
+    instance._image_uploaded = image_uploaded(instance)
+    # Вход обновляет только last_login - лишний запрос не нужен.
+    if instance.pk is None or (
+        update_fields is not None
+        and not {'username', 'image'} & set(update_fields)
+    ):
+        instance._old_username = instance.username
+        instance._old_image = instance.image.name
+        return
+    instance._old_username, instance._old_image = User.objects.filter(
+        pk=instance.pk
+    ).values_list('username', 'image').first() or (instance.username, None)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+        return
+    if instance._old_username != instance.username:
+        search.index_posts(instance.posts.values('pk'))
+    release_replaced_image(instance)
+    if update_fields is None or USER_CARD_FIELDS & set(update_fields):
+        bump_user_pages(instance)
+
+
+def bump_user_pages(user):
+    """Страницы, где видны имя или аватар пользователя."""
+    posts = user.posts.order_by()
+    page_cache.bump(
+        'index', f'author:{user.pk}', f'user:{user.pk}',
+        *(
+            f'group:{group_id}' for group_id in posts.filter(
+                group__isnull=False
+            ).values_list('group_id', flat=True).distinct()
+        ),
+        *(
+            f'post:{post_id}' for post_id in Comment.objects.filter(
+                author=user
+            ).order_by().values_list('post_id', flat=True).distinct()
+        )
+    )
+
+
+@receiver(thumbnails.thumbnails_ready)
+def thumbnails_ready(sender, name, **kwargs):
+    # Страницы, отрисованные с исходником вместо миниатюры.
+    posts = Post.objects.filter(image=name).values_list(
+        'pk', 'author_id', 'group_id'
+    )
+    page_cache.bump(
+        *(scope for post in posts for scope in page_cache.post_scopes(*post)),
+        *(
+            f'author:{user_id}' for user_id in User.objects.filter(
+                image=name
+            ).values_list('pk', flat=True)
+        )
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    release_file(instance.image.name)
@@ -0,0 +1,52 @@
+from django.db.models import Sum
+
+from .counters import count_subquery
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def rebuild(user_ids=None):
+    """Пересобирает статистику пользователей пакетными UPDATE.
+
+    Недостающие записи создаются; user_ids ограничивает набор
+    пользователей, по умолчанию - все.
+    """
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in users.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True)),
+        ignore_conflicts=True
+    )
+    stats = UserStats.objects.all()
+    if user_ids is not None:
+        stats = stats.filter(user_id__in=user_ids)
+    stats.update(
+        posts_count=count_subquery(Post.objects.all(), 'author', 'user'),
+        followers_count=count_subquery(
+            Follow.objects.all(), 'author', 'user'
+        ),
+        following_count=count_subquery(Follow.objects.all(), 'user', 'user'),
+        likes_received=(
+            count_subquery(
+                Post.objects.all(), 'author', 'user', Sum('likes_count')
+            )
+            + count_subquery(
+                Comment.objects.all(), 'author', 'user', Sum('likes_count')
+            )
+        ),
+    )
+
+
+def get_stats(user):
+    """Статистика пользователя без агрегирующих запросов.
+
+    Запись, которой ещё нет, один раз собирается с нуля; дальше её
+    поддерживают сигналы (posts.signals).
+    """
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        rebuild((user.pk,))
+        return UserStats.objects.get(user=user)
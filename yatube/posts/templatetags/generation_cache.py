@@ -0,0 +1,76 @@
+from django import template
+from django.conf import settings
+from django.core.cache.utils import make_template_fragment_key
+
+from core.caching import get_or_compute
+from posts.page_cache import get_versions
+
+register = template.Library()
+
+
+class GenerationCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, vary_on, scopes):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+        self.scopes = scopes
+
+    def render(self, context):
+        scopes = []
+        for name, value in self.scopes:
+            value = value.resolve(context)
+            if name:
+                scopes.append(f'{name}:{value}')
+            elif isinstance(value, (list, tuple)):
+                scopes.extend(value)
+            else:
+                scopes.append(value)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(
+            self.fragment_name, vary_on + get_versions(scopes)
+        )
+        # Без версий: последний удачный рендер, пока считается новый.
+        stale_key = make_template_fragment_key(
+            f'{self.fragment_name}:stale', vary_on + scopes
+        )
+        return get_or_compute(
+            key, lambda: self.nodelist.render(context),
+            settings.FRAGMENT_CACHE_TIMEOUT, name='fragment',
+            stale_key=stale_key
+        )
+
+
+@register.tag('generation_cache')
+def do_generation_cache(parser, token):
+    """Кэширует фрагмент до записи в то, что в нём показано.
+
+    {% generation_cache имя [vary_on ...] on [scope ...] %}
+
+    scope - 'index', вида group=group.pk, author=author.pk или
+    переменная со списком версий (лента подписок); это те же
+    версии, что у posts.page_cache, и сигналы увеличивают их при каждой
+    записи. Ключ фрагмента содержит текущие версии, поэтому после
+    записи фрагмент сразу рендерится заново, а без записей живёт
+    FRAGMENT_CACHE_TIMEOUT. Пока новый рендер считает один запрос,
+    остальные получают прежний фрагмент.
+    """
+    nodelist = parser.parse(('endgeneration_cache',))
+    parser.delete_first_token()
+    bits = token.split_contents()[1:]
+    if 'on' not in bits or bits.index('on') == 0:
+        raise template.TemplateSyntaxError(
+            "'generation_cache' требует имя фрагмента и 'on' со списком "
+            'версий.'
+        )
+    split = bits.index('on')
+    fragment_name = bits[0]
+    vary_on = [parser.compile_filter(bit) for bit in bits[1:split]]
+    scopes = []
+    for bit in bits[split + 1:]:
+        name, _, value = bit.rpartition('=')
+        scopes.append((name, parser.compile_filter(value)))
+    if not scopes:
+        raise template.TemplateSyntaxError(
+            "'generation_cache' требует хотя бы одну версию после 'on'."
+        )
+    return GenerationCacheNode(nodelist, fragment_name, vary_on, scopes)
@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, **flags):
+    """Список HTML карточек ленты из кэша карточек (posts.cards).
+
+    {% post_cards page_obj group_flag=True as cards %}
+    """
+    return [mark_safe(card) for card in render_cards(posts, **flags)]
@@ -0,0 +1,101 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from posts.likes import toggle_like
+from posts.models import Follow, Post, PostLike, User, UserStats
+
+
+class FastAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.author = User.objects.create(username='Test_author')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author) for i in range(5)
+        )
+        for i in range(3):
+            Follow.objects.create(
+                user=User.objects.create(username=f'reader{i}'),
+                author=cls.author
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_changelists_open(self):
+        """Списки объектов открываются без запросов на каждую строку."""
+        for model in ('post', 'comment', 'follow', 'postlike',
+                      'commentlike'):
+            with self.subTest(model=model):
+                url = reverse(f'admin:posts_{model}_changelist')
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        Post.objects.bulk_create(
+            Post(text='Ещё', author=self.author) for _ in range(5)
+        )
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(few), len(many))
+
+    def test_like_delete_keeps_counters(self):
+        """Удаление лайка в админке уменьшает счётчики."""
+        post = Post.objects.first()
+        toggle_like(post, self.admin)
+        like = PostLike.objects.get()
+        self.client.post(
+            reverse('admin:posts_postlike_delete', args=(like.pk,)),
+            {'post': 'yes'}
+        )
+        self.assertFalse(PostLike.objects.exists())
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 0)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).likes_received, 0
+        )
+
+    def test_cursor_paging(self):
+        """?cursor= отдаёт объекты с меньшим pk без OFFSET."""
+        url = reverse('admin:posts_post_changelist')
+        posts = list(Post.objects.order_by('-pk'))
+        response = self.client.get(url, {'cursor': posts[1].pk})
+        cl = response.context['cl']
+        self.assertEqual(list(cl.result_list), posts[2:])
+        self.assertIsNone(cl.next_cursor)
+
+    @override_settings(ADMIN_COUNT_LIMIT=2)
+    def test_estimated_count(self):
+        """Выше предела число объектов оценивается, а не считается."""
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        cl = response.context['cl']
+        self.assertTrue(cl.paginator.estimated)
+        self.assertGreaterEqual(cl.result_count, 3)
+        self.assertIsNone(cl.full_result_count)
+
+    def test_username_filter(self):
+        """Фильтр подписок по username без списка всех пользователей."""
+        response = self.client.get(
+            reverse('admin:posts_follow_changelist'),
+            {'user__username': 'reader1'}
+        )
+        cl = response.context['cl']
+        self.assertEqual(
+            [follow.user.username for follow in cl.result_list], ['reader1']
+        )
+        self.assertNotContains(response, 'reader2')
+
+    def test_autocomplete(self):
+        """Автодополнение авторов работает через поиск UserAdmin."""
+        response = self.client.get(
+            reverse('admin:users_user_autocomplete'), {'term': 'reader'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 3)
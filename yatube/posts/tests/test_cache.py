@@ -0,0 +1,99 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.cache import TwoTierCache
+
+
+class TwoTierCacheTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        return TwoTierCache(self.location, {
+            'OPTIONS': {'SYNC_INTERVAL': 0, **options}
+        })
+
+    def other_process(self):
+        """Тот же кэш из другого воркера: свой pid и свой L1."""
+        return mock.patch('core.cache.os.getpid', return_value=-1)
+
+    def test_basic_api(self):
+        """Основные операции ведут себя как у встроенных бэкендов."""
+        cache = self.cache
+        self.assertIsNone(cache.get('missing'))
+        cache.set('key', {'a': 1})
+        self.assertEqual(cache.get('key'), {'a': 1})
+        self.assertFalse(cache.add('key', 'other'))
+        self.assertTrue(cache.add('new', 1))
+        self.assertEqual(cache.incr('new', 2), 3)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.set_many({'x': 1, 'y': 2})
+        self.assertEqual(cache.get_many(['x', 'y', 'z']), {'x': 1, 'y': 2})
+        cache.delete('x')
+        self.assertFalse(cache.has_key('x'))
+        cache.set('gone', 1, 0)
+        self.assertIsNone(cache.get('gone'))
+        cache.clear()
+        self.assertIsNone(cache.get('key'))
+
+    def test_l1_serves_hot_keys(self):
+        """Повторное чтение не идёт в L2."""
+        self.cache.set('hot', 'value')
+        with mock.patch.object(self.cache.l2, 'get_many') as l2_get:
+            self.assertEqual(self.cache.get('hot'), 'value')
+        l2_get.assert_not_called()
+
+    def test_l1_values_are_copies(self):
+        """Изменение полученного объекта не портит кэш."""
+        self.cache.set('list', [1])
+        self.cache.get('list').append(2)
+        self.assertEqual(self.cache.get('list'), [1])
+
+    def test_invalidation_broadcast(self):
+        """Запись другого процесса выбрасывает ключ из L1."""
+        self.cache.set('shared', 'old')
+        self.assertEqual(self.cache.get('shared'), 'old')
+        with self.other_process():
+            other = self.make_cache()
+            other.set('shared', 'new')
+        self.assertEqual(self.cache.get('shared'), 'new')
+        with self.other_process():
+            other.delete('shared')
+        self.assertIsNone(self.cache.get('shared'))
+        self.cache.set('a', 1)
+        with self.other_process():
+            other.clear()
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_sync_interval(self):
+        """Чужие изменения видны не позже чем через SYNC_INTERVAL."""
+        cache = self.make_cache(SYNC_INTERVAL=60)
+        cache.set('key', 'old')
+        cache.get('key')
+        with self.other_process():
+            self.make_cache().set('key', 'new')
+        self.assertEqual(cache.get('key'), 'old')
+        cache.l1.synced_at = 0
+        self.assertEqual(cache.get('key'), 'new')
+
+    def test_cull_evicts_oldest(self):
+        """Сверх MAX_ENTRIES вытесняются старейшие ключи, даже без срока."""
+        cache = self.make_cache(
+            MAX_ENTRIES=4, CULL_FREQUENCY=2, CULL_EVERY=1
+        )
+        for number in range(5):
+            cache.set(f'page{number}', number, None)
+        # Пятая запись: ключей 5 > 4, и два старейших ушли.
+        self.assertEqual(
+            sorted(cache.get_many([f'page{n}' for n in range(5)])),
+            ['page2', 'page3', 'page4']
+        )
+        with self.other_process():
+            self.assertIsNone(self.make_cache().get('page0'))
@@ -0,0 +1,101 @@
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from core.caching import Entry, get_metrics, get_or_compute
+
+
+@override_settings(CACHE_METRICS_FLUSH=0)
+class GetOrComputeTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.compute = mock.Mock(return_value='new')
+
+    def test_miss_and_hit(self):
+        """Промах считает значение один раз, дальше оно из кэша."""
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'new')
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'new')
+        self.compute.assert_called_once()
+
+    def test_none_not_cached(self):
+        """None из compute не кэшируется."""
+        compute = mock.Mock(return_value=None)
+        get_or_compute('key', compute, 60)
+        get_or_compute('key', compute, 60)
+        self.assertEqual(compute.call_count, 2)
+
+    def test_stale_while_revalidate(self):
+        """Пока другой запрос пересчитывает, отдаётся старое значение."""
+        cache.set('key', Entry('old', time.time() - 1, 0), 60)
+        cache.add('key:lock', 1)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'old')
+        self.compute.assert_not_called()
+        cache.delete('key:lock')
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'new')
+
+    def test_stale_key_served_on_new_version(self):
+        """Ключа новой версии нет: пока его считают, отдаётся прежний."""
+        get_or_compute('key:v1', lambda: 'old', 60, stale_key='key')
+        cache.add('key:v2:lock', 1)
+        self.assertEqual(
+            get_or_compute('key:v2', self.compute, 60, stale_key='key'),
+            'old'
+        )
+        self.compute.assert_not_called()
+        cache.delete('key:v2:lock')
+        self.assertEqual(
+            get_or_compute('key:v2', self.compute, 60, stale_key='key'),
+            'new'
+        )
+        self.assertEqual(cache.get('key').value, 'new')
+
+    def test_foreign_lock_kept(self):
+        """Истёкшую и взятую другим блокировку пересчёт не снимает."""
+        def slow():
+            # Пока шёл пересчёт, блокировка истекла и её взял другой.
+            cache.set('key:lock', 'other')
+            return 'new'
+
+        get_or_compute('key', slow, 60)
+        self.assertEqual(cache.get('key:lock'), 'other')
+        cache.delete_many(['key', 'key:lock'])
+        get_or_compute('key', self.compute, 60)
+        self.assertIsNone(cache.get('key:lock'))
+
+    def test_single_flight(self):
+        """На промахе ждут результата того, кто держит блокировку."""
+        cache.add('key:lock', 1)
+
+        def finish():
+            time.sleep(0.1)
+            cache.set('key', Entry('computed', time.time() + 60, 0), 60)
+
+        thread = threading.Thread(target=finish)
+        thread.start()
+        self.assertEqual(
+            get_or_compute('key', self.compute, 60, name='flight'),
+            'computed'
+        )
+        thread.join()
+        self.compute.assert_not_called()
+        self.assertEqual(get_metrics()['flight']['coalesced'], 1)
+
+    def test_early_expiry(self):
+        """Долгий пересчёт обновляет значение до срока."""
+        cache.set('key', Entry('old', time.time() + 1, 1000), 60)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'new')
+        cache.set('key', Entry('old', time.time() + 1, 1000), 60)
+        with self.settings(CACHE_EARLY_EXPIRY_BETA=0):
+            self.assertEqual(get_or_compute('key', self.compute, 60), 'old')
+
+    def test_metrics_command(self):
+        """Команда cache_metrics выводит счётчики."""
+        get_or_compute('key', self.compute, 60, name='command')
+        out = StringIO()
+        call_command('cache_metrics', stdout=out)
+        self.assertIn('command', out.getvalue())
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts.cards import render_cards
+from posts.models import Group, Post, User
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def card(self, liked=False, **flags):
+        post = Post.objects.select_related('author', 'group').get(
+            pk=self.post.pk
+        )
+        post.liked = liked
+        return render_cards([post], **flags)[0]
+
+    def test_card_cached(self):
+        """Карточка берётся из кэша, состояние зрителя подставляется."""
+        self.card()
+        with self.assertNumQueries(1), self.assertTemplateNotUsed(
+            'posts/includes/post_card.html'
+        ):
+            liked = self.card(liked=True)
+        self.assertIn('bi-suit-heart-fill', liked)
+        self.assertNotIn('bi-suit-heart-fill', self.card())
+
+    def test_card_versions(self):
+        """Правка поста, группы и автора дают новую карточку."""
+        self.card()
+        self.card(group_flag=True)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertIn('Новый текст', self.card())
+        self.group.title = 'Новая группа'
+        self.group.save()
+        self.assertIn('Новая группа', self.card())
+        self.author.username = 'Renamed'
+        self.author.save()
+        self.assertIn('Renamed', self.card())
+        self.assertNotIn('Новая группа', self.card(group_flag=True))
@@ -0,0 +1,69 @@
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.checks import run_checks
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+# Быстрые настройки production.
+PRODUCTION_SETTINGS = {
+    'PRODUCTION': True,
+    'DEBUG': False,
+    'INSTALLED_APPS': [
+        app for app in settings.INSTALLED_APPS if app != 'debug_toolbar'
+    ],
+    'MIDDLEWARE': [
+        name for name in settings.MIDDLEWARE if 'debug_toolbar' not in name
+    ],
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'THUMBNAIL_WORKERS': 2,
+}
+
+
+def error_ids(conn_max_age=60, **overrides):
+    with mock.patch.dict(
+        connection.settings_dict, CONN_MAX_AGE=conn_max_age
+    ), override_settings(**{**PRODUCTION_SETTINGS, **overrides}):
+        return {
+            message.id for message in run_checks(
+                tags=['performance'], include_deployment_checks=True
+            )
+        }
+
+
+class PerformanceChecksTest(SimpleTestCase):
+    def test_fast_production_passes(self):
+        with tempfile.TemporaryDirectory() as static_root:
+            open(f'{static_root}/staticfiles.json', 'w').close()
+            self.assertEqual(error_ids(STATIC_ROOT=static_root), set())
+
+    def test_slow_settings_fail(self):
+        """Каждая медленная настройка в production - своя ошибка."""
+        cases = (
+            ({'DEBUG': True}, 'core.E001'),
+            ({'MIDDLEWARE': settings.MIDDLEWARE + [
+                'debug_toolbar.middleware.DebugToolbarMiddleware'
+            ]}, 'core.E002'),
+            ({'TEMPLATES': [{
+                **settings.TEMPLATES[0],
+                'OPTIONS': {'debug': True},
+            }]}, 'core.E003'),
+            ({'conn_max_age': 0}, 'core.E004'),
+            ({'CACHES': {'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            }}}, 'core.E005'),
+            ({'SESSION_ENGINE': 'django.contrib.sessions.backends.db'},
+             'core.E006'),
+            ({'THUMBNAIL_WORKERS': 0}, 'core.E008'),
+        )
+        for overrides, error_id in cases:
+            with self.subTest(error_id=error_id):
+                self.assertIn(error_id, error_ids(**overrides))
+
+    def test_unbuilt_static_fails_deploy_check(self):
+        with tempfile.TemporaryDirectory() as static_root:
+            self.assertIn('core.E007', error_ids(STATIC_ROOT=static_root))
+
+    def test_dev_not_checked(self):
+        self.assertEqual(error_ids(PRODUCTION=False, DEBUG=True), set())
@@ -0,0 +1,104 @@
+import gzip
+import zlib
+from unittest import skipIf
+
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+
+from core import middleware
+from core.caching import get_metrics
+from core.middleware import CompressionMiddleware, negotiate
+from posts.models import Post, User
+
+
+class CompressionMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create(username='Test_author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}') for number in range(10)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def process(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_page_compressed(self):
+        """Страница сжимается, а после распаковки совпадает с исходной."""
+        plain = self.client.get('/')
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 3)
+        # Тег сжатого ответа слабый, и по нему страница не меняется.
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(self.client.get(
+            '/', HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        ).status_code, 304)
+        metrics = get_metrics(middleware.EVENTS)['compress:gzip']
+        self.assertGreaterEqual(metrics['responses'], 1)
+        self.assertGreater(metrics['bytes_in'], metrics['bytes_out'])
+
+    @skipIf(middleware.brotli is None, 'brotli не установлен')
+    def test_page_brotli(self):
+        """brotli предпочитается gzip, тело распаковывается в страницу."""
+        plain = self.client.get('/')
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            middleware.brotli.decompress(response.content), plain.content
+        )
+        chunks = [b'<p>' + b'x' * 1000 + b'</p>'] * 3
+        response = self.process(
+            StreamingHttpResponse(iter(chunks)), accept_encoding='br'
+        )
+        self.assertEqual(
+            middleware.brotli.decompress(b''.join(response.streaming_content)),
+            b''.join(chunks)
+        )
+
+    def test_negotiate(self):
+        cases = (
+            ('gzip, deflate', 'gzip'),
+            ('gzip;q=0, *', None if middleware.brotli is None else 'br'),
+            ('GZIP;q=0.5', 'gzip'),
+            ('identity', None),
+            ('', None),
+        )
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(negotiate(header), expected)
+
+    def test_streaming_compressed_by_chunks(self):
+        """Поток сжимается по частям: первая часть готова сразу."""
+        chunks = [b'<p>' + b'x' * 1000 + b'</p>'] * 3
+        response = self.process(StreamingHttpResponse(iter(chunks)))
+        self.assertFalse(response.has_header('Content-Length'))
+        stream = iter(response.streaming_content)
+        decompressor = zlib.decompressobj(31)
+        self.assertEqual(decompressor.decompress(next(stream)), chunks[0])
+        rest = b''.join(decompressor.decompress(part) for part in stream)
+        self.assertEqual(rest, b''.join(chunks[1:]))
+        self.assertTrue(decompressor.eof)
+
+    def test_skipped(self):
+        """Картинки, маленькие и уже сжатые ответы не сжимаются."""
+        cases = (
+            HttpResponse(b'x' * 1000, content_type='image/jpeg'),
+            HttpResponse(b'x' * 100),
+            HttpResponse(b'x' * 1000, content_type='text/html; charset=utf-8'),
+        )
+        cases[2]['Content-Encoding'] = 'identity'
+        for response in cases:
+            with self.subTest(content_type=response['Content-Type']):
+                response = self.process(response)
+                self.assertEqual(response.content[:1], b'x')
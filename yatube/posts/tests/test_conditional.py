@@ -0,0 +1,129 @@
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.likes import toggle_like
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+        cls.reader = User.objects.create(username='Test_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def assert_not_modified(self, client, url):
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        return etag
+
+    def assert_modified(self, client, url, action):
+        etag = self.assert_not_modified(client, url)
+        action()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pages_not_modified(self):
+        """Неизменившиеся страницы отдаются как 304."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assert_not_modified(self.guest_client, url)
+                self.assert_not_modified(self.reader_client, url)
+        self.assert_not_modified(
+            self.reader_client, reverse('posts:follow_index')
+        )
+
+    def test_not_modified_without_render(self):
+        """304 стоит одного запроса к базе и не рендерит шаблон."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertIsNone(response.context)
+
+    def test_last_modified(self):
+        """If-Modified-Since тоже даёт 304."""
+        url = reverse('posts:index')
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_writes_change_etag(self):
+        """Новый пост, комментарий и лайк меняют ETag."""
+        detail = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assert_modified(
+            self.guest_client, reverse('posts:index'),
+            lambda: Post.objects.create(text='Новый', author=self.author)
+        )
+        self.assert_modified(
+            self.guest_client, detail,
+            lambda: Comment.objects.create(
+                text='Комментарий', author=self.reader, post=self.post
+            )
+        )
+        self.assert_modified(
+            self.guest_client, detail,
+            lambda: toggle_like(self.post, self.reader)
+        )
+
+    def test_viewer_marker(self):
+        """Подписка зрителя меняет его страницы, но ETag у всех свой."""
+        url = reverse('posts:index')
+        self.assertNotEqual(
+            self.guest_client.get(url)['ETag'],
+            self.reader_client.get(url)['ETag']
+        )
+        self.assert_modified(
+            self.reader_client, url,
+            lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            )
+        )
+        self.assert_modified(
+            self.reader_client, reverse('posts:follow_index'),
+            lambda: Post.objects.create(text='Новый', author=self.author)
+        )
+
+    def test_csrf_cookie_changes_etag(self):
+        """Новая CSRF-cookie - новая страница: старый токен формы устарел."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.reader_client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        etag = self.assert_not_modified(self.reader_client, url)
+        self.reader_client.cookies[settings.CSRF_COOKIE_NAME] = 'b' * 64
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_missing_page(self):
+        """У несуществующей страницы нет валидаторов."""
+        response = self.guest_client.get(
+            reverse('posts:group_list', args=('missing',))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertFalse(response.has_header('ETag'))
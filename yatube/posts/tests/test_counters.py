@@ -0,0 +1,195 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.likes import toggle_like
+from posts.models import (
+    Comment, CommentLike, Post, PostLike, User, UserStats
+)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+        cls.user = User.objects.create(username='Test_reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.reader = Client()
+        self.reader.force_login(self.user)
+
+    def test_comment_counter(self):
+        """Добавление и удаление комментария меняют счётчик поста."""
+        self.reader.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            data={'text': 'Комментарий'}
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        comment = Comment.objects.get(post=self.post)
+        self.reader.get(reverse('posts:del_comment', args=(comment.pk,)))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_like_counters(self):
+        """Лайк и повторный клик меняют счётчики поста и комментария."""
+        comment = Comment.objects.create(
+            text='Комментарий', post=self.post, author=self.author
+        )
+        urls = (
+            (self.post, reverse('posts:add_like_to_post', args=(
+                self.post.pk,))),
+            (comment, reverse('posts:add_like_to_comment', args=(
+                comment.pk,))),
+        )
+        for obj, url in urls:
+            with self.subTest(obj=obj):
+                self.reader.get(url, HTTP_REFERER='/')
+                obj.refresh_from_db()
+                self.assertEqual(obj.likes_count, 1)
+                self.reader.get(url, HTTP_REFERER='/')
+                obj.refresh_from_db()
+                self.assertEqual(obj.likes_count, 0)
+
+    def test_toggle_like(self):
+        """Лайк ставится и снимается, дубль лайка невозможен."""
+        self.assertTrue(toggle_like(self.post, self.user))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PostLike.objects.create(post=self.post, user=self.user)
+        self.assertFalse(toggle_like(self.post, self.user))
+        self.assertFalse(PostLike.objects.exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_cascade_likes_in_bulk(self):
+        """Удаление поста меняет счётчики лайков пачкой, а не по лайку."""
+        comment_author = User.objects.create(username='Test_commenter')
+
+        def delete_liked_post(likes):
+            post = Post.objects.create(text='Пост', author=self.author)
+            comment = Comment.objects.create(
+                text='Комментарий', post=post, author=comment_author
+            )
+            users = User.objects.bulk_create(
+                User(username=f'Test_fan_{likes}_{number}')
+                for number in range(likes)
+            )
+            for user in users:
+                toggle_like(post, user)
+                toggle_like(comment, user)
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            return len(queries)
+
+        self.assertEqual(delete_liked_post(1), delete_liked_post(5))
+        for user in (self.author, comment_author):
+            self.assertEqual(
+                UserStats.objects.get(user=user).likes_received, 0
+            )
+
+    def test_user_delete_forgets_likes(self):
+        """Удаление пользователя снимает его лайки со счётчиков."""
+        comment = Comment.objects.create(
+            text='Комментарий', post=self.post, author=self.author
+        )
+        fan = User.objects.create(username='Test_fan')
+        toggle_like(self.post, fan)
+        toggle_like(comment, fan)
+        fan.delete()
+        self.assertFalse(CommentLike.objects.exists())
+        for obj in (self.post, comment):
+            obj.refresh_from_db()
+            self.assertEqual(obj.likes_count, 0)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).likes_received, 0
+        )
+
+    def test_save_keeps_counters(self):
+        """Сохранение устаревшего объекта не затирает счётчик."""
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(
+            text='Комментарий', post=self.post, author=self.author
+        )
+        stale.text = 'Новый текст'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.post.text, 'Новый текст')
+
+    def test_recount_command(self):
+        """Команда recount_counters восстанавливает счётчики."""
+        Comment.objects.create(
+            text='Комментарий', post=self.post, author=self.author
+        )
+        Post.objects.update(comments_count=10, likes_count=3)
+        call_command('recount_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.post.likes_count, 0)
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+        cls.user = User.objects.create(username='Test_reader')
+
+    def setUp(self):
+        self.reader = Client()
+        self.reader.force_login(self.user)
+
+    def test_stats_follow_writes(self):
+        """Посты, подписки и лайки меняют статистику пользователей."""
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.reader.get(reverse('posts:profile_follow', args=(self.author,)))
+        self.reader.get(
+            reverse('posts:add_like_to_post', args=(post.pk,)),
+            HTTP_REFERER='/'
+        )
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.likes_received),
+            (1, 1, 1)
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 1
+        )
+        self.reader.get(
+            reverse('posts:profile_unfollow', args=(self.author,))
+        )
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.likes_received),
+            (0, 0, 0)
+        )
+
+    def test_rebuild_command(self):
+        """Команда rebuild_user_stats собирает статистику заново."""
+        Post.objects.create(text='Пост', author=self.author)
+        UserStats.objects.all().delete()
+        call_command('rebuild_user_stats', stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertEqual(UserStats.objects.count(), User.objects.count())
+
+    def test_user_card_without_aggregates(self):
+        """Карточка автора не выполняет COUNT-запросов."""
+        Post.objects.create(text='Пост', author=self.author)
+        url = reverse('posts:profile', args=(self.author,))
+        # Первый запрос кладёт в кэш число постов ленты автора.
+        self.reader.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader.get(url)
+        self.assertEqual(response.context['stats'].posts_count, 1)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] for query in queries.captured_queries
+        ))
@@ -0,0 +1,112 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+
+from posts import feed, follow_graph
+from posts.models import FeedItem, Follow, Post, User
+
+
+class FollowFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+        cls.user = User.objects.create(username='Test_follower')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fan_out_on_post_create(self):
+        """Новый пост попадает во входящую ленту подписчика."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            FeedItem.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertEqual(list(feed.follow_feed(self.user)), [post])
+
+    def test_backfill_and_prune(self):
+        """Подписка добавляет старые посты автора, отписка убирает их."""
+        post = Post.objects.create(text='Старый пост', author=self.author)
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(list(feed.follow_feed(self.user)), [post])
+        follow.delete()
+        self.assertFalse(FeedItem.objects.filter(user=self.user).exists())
+        self.assertFalse(feed.follow_feed(self.user).exists())
+
+    def test_pulled_author(self):
+        """Посты популярного автора не раздаются, а читаются через pull."""
+        Follow.objects.create(user=self.user, author=self.author)
+        with self.settings(FEED_FANOUT_LIMIT=0):
+            cache.clear()
+            post = Post.objects.create(
+                text='Пост популярного автора', author=self.author
+            )
+            self.assertFalse(FeedItem.objects.filter(post=post).exists())
+            self.assertEqual(list(feed.follow_feed(self.user)), [post])
+
+    def test_inbox_paged_by_index(self):
+        """Лента листается по ключу FeedItem, а не по полям поста."""
+        Follow.objects.create(user=self.user, author=self.author)
+        for number in range(3):
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+        posts = feed.follow_feed(self.user).order_by(
+            *(f'-{key}' for key in feed.KEYS)
+        )
+        with connection.cursor() as cursor:
+            sql, params = posts.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('feeditem_user_feed_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertEqual(
+            [post.text for post in posts], ['Пост 2', 'Пост 1', 'Пост 0']
+        )
+
+    def test_author_leaves_pull(self):
+        """Посты, написанные в режиме pull, возвращаются в ленты."""
+        other = User.objects.create(username='Other_follower')
+        Follow.objects.create(user=self.user, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        with self.settings(FEED_FANOUT_LIMIT=1):
+            cache.clear()
+            post = Post.objects.create(
+                text='Пост популярного автора', author=self.author
+            )
+            self.assertFalse(FeedItem.objects.filter(post=post).exists())
+            follow.delete()
+            self.assertFalse(feed.is_pulled(self.author.pk))
+            self.assertTrue(
+                FeedItem.objects.filter(user=self.user, post=post).exists()
+            )
+            self.assertEqual(list(feed.follow_feed(self.user)), [post])
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+        cls.user = User.objects.create(username='Test_follower')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_check_without_queries(self):
+        """Повторная проверка подписки не обращается к базе."""
+        self.assertFalse(follow_graph.is_following(self.user, self.author))
+        with self.assertNumQueries(0):
+            self.assertFalse(
+                follow_graph.is_following(self.user, self.author)
+            )
+
+    def test_follow_unfollow_invalidate(self):
+        """Подписка и отписка сразу видны в графе подписок."""
+        self.assertFalse(follow_graph.is_following(self.user, self.author))
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(follow_graph.is_following(self.user, self.author))
+        self.assertEqual(
+            list(follow_graph.followed_ids(self.user)), [self.author.pk]
+        )
+        follow.delete()
+        self.assertFalse(follow_graph.is_following(self.user, self.author))
@@ -84,7 +84,10 @@ class PostCreateFormTest(TestCase):
         self.assertEqual(new_post.author, self.author_post)
         self.assertEqual(new_post.text, form_data['text'])
         self.assertEqual(new_post.group.pk, form_data['group'])
-        self.assertEqual(new_post.image, 'posts/small.gif')
+        self.assertRegex(
+            new_post.image.name,
+            r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$'
+        )
 
     def test_edit_post(self):
         """Валидная форма изменяет запись в Post."""
@@ -0,0 +1,117 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import page_cache
+from posts.likes import toggle_like
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+        cls.reader = User.objects.create(username='Test_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def versions(self):
+        scopes = (
+            'index', f'post:{self.post.pk}', f'author:{self.author.pk}',
+            f'author:{self.reader.pk}', f'group:{self.group.pk}',
+            f'group:{self.other_group.pk}',
+        )
+        return dict(zip(scopes, page_cache.get_versions(scopes)))
+
+    def assert_bumped(self, action, *scopes):
+        before = self.versions()
+        action()
+        after = self.versions()
+        changed = {scope for scope in before if before[scope] != after[scope]}
+        self.assertEqual(changed, set(scopes))
+
+    def test_anonymous_page_cached(self):
+        """Повторный запрос анонима отдаётся из кэша без рендеринга."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        response = self.guest_client.get(url)
+        self.assertIsNotNone(response.context)
+        cached = self.guest_client.get(url)
+        self.assertIsNone(cached.context)
+        self.assertEqual(cached.content, response.content)
+
+    def test_unknown_params_ignored(self):
+        """Лишние параметры не плодят копии, page и cursor - учитываются."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.assertIsNone(
+            self.guest_client.get(url, {'utm_source': 'feed'}).context
+        )
+        self.assertIsNotNone(self.guest_client.get(url, {'page': 2}).context)
+
+    def test_authorized_not_cached(self):
+        """Авторизованные пользователи получают свежую страницу."""
+        client = Client()
+        client.force_login(self.reader)
+        client.get(reverse('posts:index'))
+        self.assertIsNotNone(client.get(reverse('posts:index')).context)
+
+    def test_writes_bump_versions(self):
+        """Записи меняют версии только затронутых страниц."""
+        post_pages = (
+            'index', f'post:{self.post.pk}', f'author:{self.author.pk}',
+            f'group:{self.group.pk}',
+        )
+        self.assert_bumped(
+            lambda: Comment.objects.create(
+                text='Комментарий', post=self.post, author=self.reader
+            ),
+            *post_pages
+        )
+        self.assert_bumped(
+            lambda: toggle_like(self.post, self.reader), *post_pages
+        )
+        self.assert_bumped(
+            lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            ),
+            f'author:{self.author.pk}', f'author:{self.reader.pk}'
+        )
+
+        def move():
+            self.post.group = self.other_group
+            self.post.save()
+
+        self.assert_bumped(move, *post_pages, f'group:{self.other_group.pk}')
+
+    def test_new_post_shown(self):
+        """Новый пост сразу виден анониму на закэшированной странице."""
+        url = reverse('posts:profile', args=(self.author.username,))
+        self.guest_client.get(url)
+        Post.objects.create(text='Свежий пост', author=self.author)
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Свежий пост')
+
+    def test_detail_ignores_unrelated_writes(self):
+        """Чужие посты и лайки не сбрасывают страницу поста."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.guest_client.get(url)
+        other = Post.objects.create(
+            text='Чужой пост', author=self.reader, group=self.group
+        )
+        toggle_like(other, self.author)
+        self.assertIsNone(self.guest_client.get(url).context)
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertContains(self.guest_client.get(url), 'Новое название')
@@ -0,0 +1,97 @@
+from django.contrib.admin.sites import site
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Group, Post, SearchTerm, User
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Pushkin')
+        cls.group = Group.objects.create(
+            title='Стихи', slug='poems', description='Описание'
+        )
+        cls.best = Post.objects.create(
+            text='Мороз и солнце, день чудесный', author=cls.author
+        )
+        cls.other = Post.objects.create(
+            text='Ещё ты дремлешь, друг прелестный', author=cls.author,
+            group=cls.group
+        )
+        cls.partial = Post.objects.create(
+            text='Солнце село', author=User.objects.create(username='Other')
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def found(self, query):
+        return [post.pk for post in search.SearchResults(query)]
+
+    def check_search(self):
+        self.assertEqual(
+            self.found('мороз солнце'), [self.best.pk, self.partial.pk]
+        )
+        self.assertEqual(self.found('СТИХИ'), [self.other.pk])
+        self.assertEqual(
+            set(self.found('pushkin')), {self.best.pk, self.other.pk}
+        )
+        self.assertEqual(self.found('"OR ('), [])
+        self.assertEqual(self.found('вьюга'), [])
+
+    def test_fts(self):
+        """Поиск по FTS5 находит по тексту, группе и автору."""
+        self.assertTrue(search.fts_available())
+        self.check_search()
+
+    @override_settings(SEARCH_USE_FTS=False)
+    def test_inverted_index(self):
+        """Без FTS5 поиск идёт по таблице SearchTerm."""
+        search.rebuild()
+        self.assertTrue(SearchTerm.objects.filter(term='мороз').exists())
+        self.check_search()
+
+    def test_index_follows_changes(self):
+        """Правка поста, группы и автора и удаление поста видны в поиске."""
+        post = Post.objects.create(text='Буря мглою', author=self.author)
+        self.assertEqual(self.found('буря'), [post.pk])
+        post.text = 'Небо кроет'
+        post.save()
+        self.assertEqual(self.found('буря'), [])
+        self.group.title = 'Поэзия'
+        self.group.save()
+        self.assertEqual(self.found('поэзия'), [self.other.pk])
+        self.author.username = 'Alexander'
+        self.author.save()
+        self.assertIn(post.pk, self.found('alexander'))
+        post.delete()
+        self.assertNotIn(post.pk, self.found('alexander'))
+
+    def test_search_page_cursor(self):
+        """Страница поиска листается курсором в порядке релевантности."""
+        url = reverse('posts:search')
+        with self.settings(COUNT_POSTS=1):
+            response = self.guest_client.get(url, {'q': 'мороз солнце'})
+            results = response.context['results']
+            self.assertEqual(list(results), [self.best])
+            response = self.guest_client.get(
+                url, {'q': 'мороз солнце', 'cursor': results.next_cursor}
+            )
+            results = response.context['results']
+        self.assertEqual(list(results), [self.partial])
+        self.assertIsNone(results.next_cursor)
+
+    def test_admin_search(self):
+        """Поиск в админке постов идёт через индекс."""
+        admin = site._registry[Post]
+        request = RequestFactory().get('/')
+        queryset, distinct = admin.get_search_results(
+            request, Post.objects.all(), 'солнце'
+        )
+        self.assertEqual(
+            set(queryset.values_list('pk', flat=True)),
+            {self.best.pk, self.partial.pk}
+        )
@@ -0,0 +1,74 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipIf
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import TestCase, override_settings
+
+from core import staticfiles
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(STATIC_ROOT=TEMP_STATIC_ROOT)
+class StaticBuildTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def read(self, name):
+        with open(os.path.join(TEMP_STATIC_ROOT, name), 'rb') as file:
+            return file.read()
+
+    def test_hashed_names(self):
+        """{% static %} отдаёт имена с хэшем, а CSS ссылается на них же."""
+        url = static('css/icons.css')
+        self.assertRegex(url, r'^/static/css/icons\.[0-9a-f]{12}\.css$')
+        css = self.read(url[len(settings.STATIC_URL):]).decode()
+        self.assertRegex(css, r'suit-heart\.[0-9a-f]{12}\.svg')
+        self.assertNotIn('cdn.jsdelivr.net', css)
+
+    def test_precompressed(self):
+        """Рядом с файлом с хэшем лежит его сжатая копия."""
+        name = static('js/actions.js')[len(settings.STATIC_URL):]
+        self.assertEqual(
+            gzip.decompress(self.read(name + '.gz')), self.read(name)
+        )
+
+    @skipIf(staticfiles.brotli is None, 'brotli не установлен')
+    def test_precompressed_brotli(self):
+        """С brotli рядом лежит и копия .br."""
+        name = static('js/actions.js')[len(settings.STATIC_URL):]
+        self.assertEqual(
+            staticfiles.brotli.decompress(self.read(name + '.br')),
+            self.read(name)
+        )
+
+    def test_missing_file_not_fatal(self):
+        """В разработке файл вне сборки отдаётся под исходным именем."""
+        self.assertEqual(static('css/missing.css'), '/static/css/missing.css')
+
+    @override_settings(DEBUG=False, TESTING=False)
+    def test_missing_file_fatal_in_production(self):
+        """В production файл вне сборки - ошибка, а не имя без хэша."""
+        with self.assertRaises(ValueError):
+            static('css/missing.css')
+
+    def test_page_uses_hashed_assets(self):
+        """Иконки грузятся со своего сервера, а не с CDN."""
+        cache.clear()
+        content = self.client.get('/').content.decode()
+        self.assertRegex(content, r'/static/css/icons\.[0-9a-f]{12}\.css')
+        self.assertNotIn('cdn.jsdelivr.net', content)
@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.models import StoredFile
+from core.storage import ContentAddressedStorage
+from core.views import media
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # TestCase не коммитит транзакции - выполняем колбэки сразу.
+        patcher = mock.patch(
+            'core.storage.transaction.on_commit',
+            side_effect=lambda callback: callback()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            text='Пост', author=self.author,
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif')
+        )
+
+    def test_same_content_stored_once(self):
+        """Одинаковые загрузки - один файл с двумя ссылками."""
+        first = self.create_post('first.GIF')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name,
+            r'^posts/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.gif$'
+        )
+        self.assertEqual(StoredFile.objects.get().refs, 2)
+
+    def test_file_deleted_with_last_reference(self):
+        """Файл удаляется только вместе с последним постом."""
+        first = self.create_post()
+        second = self.create_post()
+        path = first.image.path
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(StoredFile.objects.get().refs, 1)
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_replaced_image_released(self):
+        """Замена картинки снимает ссылку со старого файла."""
+        post = self.create_post()
+        path = post.image.path
+        post.image = SimpleUploadedFile('new.gif', SMALL_GIF + b'\x00')
+        post.save()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(StoredFile.objects.get().name, post.image.name)
+
+    def test_same_image_reuploaded(self):
+        """Повторная загрузка того же файла не добавляет ссылку."""
+        post = self.create_post()
+        path = post.image.path
+        post.image = SimpleUploadedFile('again.gif', SMALL_GIF)
+        post.save()
+        self.assertEqual(StoredFile.objects.get().refs, 1)
+        post.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_missing_file_rewritten(self):
+        """Файл пишется заново, даже если строка StoredFile осталась."""
+        path = self.create_post().image.path
+        os.remove(path)
+        self.create_post()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(StoredFile.objects.get().refs, 2)
+
+    def test_failed_write_not_counted(self):
+        """Ошибка записи откатывает ссылку вместе с транзакцией."""
+        with mock.patch.object(
+            ContentAddressedStorage, 'write', side_effect=OSError
+        ):
+            with self.assertRaises(OSError), transaction.atomic():
+                self.create_post()
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_legacy_file_kept(self):
+        """Файлы без учёта ссылок не удаляются."""
+        default_storage.write(
+            'posts/legacy.gif', SimpleUploadedFile('legacy.gif', SMALL_GIF)
+        )
+        self.assertFalse(default_storage.release('posts/legacy.gif'))
+        self.assertTrue(default_storage.exists('posts/legacy.gif'))
+
+    def test_media_cached_forever(self):
+        """Файлы с адресом по содержимому отдаются с бессрочным кэшем."""
+        name = self.create_post().image.name
+        default_storage.write(
+            'posts/legacy.gif', SimpleUploadedFile('legacy.gif', SMALL_GIF)
+        )
+        request = RequestFactory().get('/media/')
+        response = media(request, name, document_root=TEMP_MEDIA_ROOT)
+        self.assertIn('immutable', response['Cache-Control'])
+        response = media(
+            request, 'posts/legacy.gif', document_root=TEMP_MEDIA_ROOT
+        )
+        self.assertFalse(response.has_header('Cache-Control'))
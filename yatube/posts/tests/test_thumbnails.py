@@ -0,0 +1,190 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+
+from core import thumbnails
+from posts import page_cache
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def jpeg(name='photo.jpg', size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+        # TestCase не коммитит транзакции - выполняем колбэки сразу.
+        patcher = mock.patch(
+            'core.thumbnails.transaction.on_commit',
+            side_effect=lambda callback: callback()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assert_pregenerated(self, image, geometry):
+        """Миниатюра берётся из хранилища ключей без декодирования."""
+        with mock.patch.object(
+            default.engine, 'get_image', side_effect=AssertionError
+        ):
+            thumbnail = get_thumbnail(
+                image, geometry, crop='center', upscale=True
+            )
+        self.assertTrue(thumbnail.exists())
+
+    def test_post_upload_pregenerates(self):
+        """Картинка поста ужимается сразу после сохранения."""
+        self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'С картинкой', 'image': jpeg()}
+        )
+        post = Post.objects.get(text='С картинкой')
+        self.assert_pregenerated(post.image, '960x600')
+
+    def test_avatar_upload_pregenerates(self):
+        """Аватар ужимается после редактирования профиля."""
+        self.client.post(
+            reverse('users:change_user', args=(self.author.pk,)),
+            {'username': self.author.username, 'image': jpeg('avatar.jpg')}
+        )
+        self.author.refresh_from_db()
+        self.assert_pregenerated(self.author.image, '180x240')
+
+    def test_backfill_command(self):
+        """Команда заготавливает миниатюры уже загруженных картинок."""
+        post = Post.objects.create(text='Старый', author=self.author)
+        post.image.save('old.jpg', jpeg(), save=False)
+        Post.objects.filter(pk=post.pk).update(image=post.image.name)
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn('1/1', out.getvalue())
+        self.assert_pregenerated(post.image, '960x600')
+
+    @override_settings(THUMBNAIL_WEBP=True)
+    def test_backfill_command_webp(self):
+        """Команда заготавливает и WEBP-копии, если Pillow их пишет."""
+        post = Post.objects.create(text='Старый', author=self.author)
+        post.image.save('old.jpg', jpeg(), save=False)
+        Post.objects.filter(pk=post.pk).update(image=post.image.name)
+        with mock.patch.object(thumbnails, 'WEBP', True), mock.patch(
+            'core.management.commands.generate_thumbnails.generate'
+        ) as generate:
+            call_command('generate_thumbnails', workers=1, stdout=StringIO())
+        name, field_presets = generate.call_args[0]
+        self.assertEqual(name, post.image.name)
+        self.assertIn(
+            ('960x600', {'crop': 'center', 'upscale': True, 'format': 'WEBP'}),
+            field_presets
+        )
+
+    def posts_with_images(self, count):
+        posts = []
+        for index in range(count):
+            post = Post.objects.create(
+                text=f'Пост {index}', author=self.author
+            )
+            post.image.save(f'photo{index}.jpg', jpeg(), save=False)
+            Post.objects.filter(pk=post.pk).update(image=post.image.name)
+            posts.append(post)
+        return posts
+
+    def test_page_lookup_batched(self):
+        """Записи миниатюр всей страницы читаются одним запросом."""
+        posts = self.posts_with_images(3)
+        for post in posts:
+            thumbnails.generate(
+                post.image.name, thumbnails.presets(Post, 'image')
+            )
+        cache.clear()
+        with self.assertNumQueries(1):
+            thumbnails.attach(posts)
+        for post in posts:
+            with self.subTest(post=post):
+                self.assertTrue(post.thumbnail.ready)
+                src = post.thumbnail.src
+                self.assertEqual((src.width, src.height), (960, 600))
+        with self.assertNumQueries(0):
+            thumbnails.attach(posts)
+
+    def test_missing_thumbnail_falls_back(self):
+        """Без миниатюры отдаётся исходник, а миниатюра создаётся в фоне."""
+        post, = self.posts_with_images(1)
+        with mock.patch('core.thumbnails.schedule_file') as schedule_file:
+            thumbnails.attach([post])
+            thumbnails.attach([post])
+        schedule_file.assert_called_once()
+        self.assertFalse(post.thumbnail.ready)
+        self.assertEqual(post.thumbnail.url, post.image.url)
+        cache.clear()
+        scopes = [f'post:{post.pk}']
+        before = page_cache.get_versions(scopes)
+        thumbnails.attach([post])
+        thumbnails.attach([post])
+        self.assertTrue(post.thumbnail.ready)
+        # Страницы с исходником вместо миниатюры устарели.
+        self.assertNotEqual(page_cache.get_versions(scopes), before)
+
+    def test_picture_tag(self):
+        """Карточка выводит srcset всех ширин, размеры и ленивую загрузку."""
+        post, = self.posts_with_images(1)
+        thumbnails.generate(post.image.name, thumbnails.presets(Post, 'image'))
+        response = self.client.get(reverse('posts:index'))
+        content = response.content.decode()
+        for width in (320, 640, 960):
+            with self.subTest(width=width):
+                self.assertRegex(content, rf'srcset="[^"]* {width}w')
+        self.assertIn('width="960" height="600"', content)
+        self.assertIn('loading="lazy"', content)
+        detail = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(detail, 'loading="eager"')
+
+    def test_picture_fallback_dimensions(self):
+        """Пока миниатюр нет, у исходника размеры из модели."""
+        post, = self.posts_with_images(1)
+        Post.objects.filter(pk=post.pk).update(
+            image_width=1200, image_height=800
+        )
+        with mock.patch('core.thumbnails.schedule_file'):
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{post.image.url}"')
+        self.assertContains(response, 'width="1200" height="800"')
+
+    def test_picture_webp_sources(self):
+        """WEBP-миниатюры выводятся отдельным <source>."""
+        picture = thumbnails.Picture([
+            thumbnails.Thumbnail('/a.jpg', 640, 400, None),
+            thumbnails.Thumbnail('/a.webp', 640, 400, 'WEBP'),
+            thumbnails.Thumbnail('/b.jpg', 320, 200, None),
+        ], thumbnails.Thumbnail('/orig.jpg', None, None, None))
+        self.assertEqual(picture.srcset, '/b.jpg 320w, /a.jpg 640w')
+        self.assertEqual(picture.webp_srcset, '/a.webp 640w')
+        self.assertEqual(picture.src.url, '/a.jpg')
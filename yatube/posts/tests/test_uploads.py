@@ -0,0 +1,111 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image, PngImagePlugin
+
+from posts.forms import PostForm
+from posts.models import Post, User
+from users.forms import ChangeForm
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def upload(name, image_format, size=(400, 300), mode='RGB', **options):
+    buffer = BytesIO()
+    Image.new(mode, size, 'red').save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def exif(orientation):
+    data = Image.Exif()
+    data[0x0112] = orientation
+    data[0x010F] = 'Camera'
+    return data.tobytes()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, UPLOAD_MAX_SIDE=200)
+class ImageIngestTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def save_post(self, image):
+        form = PostForm({'text': 'Пост'}, {'image': image})
+        self.assertTrue(form.is_valid(), form.errors)
+        form.instance.author = self.author
+        return form.save()
+
+    def test_master_normalized(self):
+        """Мастер повёрнут по EXIF, ужат и сохранён без метаданных."""
+        post = self.save_post(
+            upload('photo.jpg', 'JPEG', exif=exif(orientation=6))
+        )
+        with Image.open(post.image.path) as master:
+            self.assertEqual(master.size, (150, 200))
+            self.assertNotIn('exif', master.info)
+        post = Post.objects.get(pk=post.pk)
+        self.assertEqual((post.image_width, post.image_height), (150, 200))
+        self.assertEqual(post.image_bytes, post.image.size)
+
+    def test_png_metadata_stripped(self):
+        """Из PNG не попадают в мастер ни EXIF, ни текстовые чанки."""
+        text = PngImagePlugin.PngInfo()
+        text.add_text('Author', 'Secret')
+        post = self.save_post(
+            upload('photo.png', 'PNG', exif=exif(orientation=1), pnginfo=text)
+        )
+        with Image.open(post.image.path) as master:
+            self.assertNotIn('exif', master.info)
+            self.assertNotIn('Author', master.info)
+            self.assertEqual(master.getexif().get(0x010F), None)
+
+    def test_format_kept_or_converted(self):
+        """Веб-форматы сохраняются, остальные переводятся в JPEG/PNG."""
+        cases = (
+            (upload('a.png', 'PNG', mode='RGBA'), '.png'),
+            (upload('a.gif', 'GIF', mode='P'), '.gif'),
+            (upload('a.bmp', 'BMP'), '.jpg'),
+            (upload('a.tiff', 'TIFF', mode='RGBA'), '.png'),
+        )
+        for image, extension in cases:
+            with self.subTest(image=image.name):
+                post = self.save_post(image)
+                self.assertTrue(post.image.name.endswith(extension))
+
+    def test_limits(self):
+        """Слишком большие файлы и картинки отклоняются."""
+        for limits in (
+            {'UPLOAD_MAX_BYTES': 100},
+            {'UPLOAD_MAX_PIXELS': 400 * 300 - 1},
+        ):
+            with self.subTest(limits=limits), self.settings(**limits):
+                form = PostForm(
+                    {'text': 'Пост'}, {'image': upload('a.png', 'PNG')}
+                )
+                self.assertIn('image', form.errors)
+
+    def test_avatar(self):
+        """Аватар проходит тот же приём, очистка сбрасывает размеры."""
+        form = ChangeForm(
+            {'username': self.author.username},
+            {'image': upload('avatar.jpg', 'JPEG')},
+            instance=self.author
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        user = form.save()
+        self.assertEqual((user.image_width, user.image_height), (200, 150))
+        form = ChangeForm(
+            {'username': user.username, 'image-clear': 'on'}, instance=user
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIsNone(form.save().image_width)
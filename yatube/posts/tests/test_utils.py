@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts.models import Group, Post, User
+from posts.utils import FeedPaginator, feed_count_key
+
+
+class FeedPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+        cls.group = Group.objects.create(
+            title='тестовая группа',
+            slug='test_group'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Test{count}', author=cls.author, group=cls.group)
+            for count in range(5)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached(self):
+        """Число постов ленты берётся из кэша без COUNT(*)."""
+        posts = Post.objects.all()
+        self.assertEqual(FeedPaginator(posts, 2, feed='index').count, 5)
+        self.assertIsNotNone(cache.get(feed_count_key('index')))
+        with self.assertNumQueries(0):
+            FeedPaginator(posts, 2, feed='index').count
+
+    def test_count_invalidated_on_write(self):
+        """Создание и удаление поста сбрасывает число постов его лент."""
+        feeds = (
+            'index', f'group:{self.group.pk}', f'author:{self.author.pk}'
+        )
+        for feed in feeds:
+            cache.set(feed_count_key(feed), 5)
+        post = Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group
+        )
+        for feed in feeds:
+            with self.subTest(feed=feed):
+                self.assertIsNone(cache.get(feed_count_key(feed)))
+                cache.set(feed_count_key(feed), 6)
+        post.delete()
+        for feed in feeds:
+            with self.subTest(feed=feed):
+                self.assertIsNone(cache.get(feed_count_key(feed)))
+
+    def test_page_window(self):
+        """Окно номеров страниц не растёт вместе с лентой."""
+        paginator = FeedPaginator(range(1000), 10)
+        with self.settings(PAGE_WINDOW=2):
+            self.assertEqual(
+                paginator.page_window(50),
+                [1, None, 48, 49, 50, 51, 52, None, 100]
+            )
+            self.assertEqual(
+                paginator.page_window(1), [1, 2, 3, None, 100]
+            )
+            self.assertEqual(
+                paginator.page_window(100), [1, None, 98, 99, 100]
+            )
+            self.assertEqual(
+                FeedPaginator(range(30), 10).page_window(2), [1, 2, 3]
+            )
@@ -1,4 +1,5 @@
 import shutil
+from http import HTTPStatus
 import tempfile
 
 from django.conf import settings
@@ -8,6 +9,7 @@ from django.urls import reverse
 from django import forms
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.utils.http import urlsafe_base64_encode
 
 
 from posts.forms import PostForm
@@ -79,7 +81,7 @@ class PostPagesTests(TestCase):
         self.assertEqual(task_author_0, self.post.author.username)
         self.assertEqual(task_date_0, self.post.pub_date)
         self.assertEqual(task_group_0, self.post.group.title)
-        self.assertEqual(str(task_image_0), 'posts/small.gif')
+        self.assertEqual(str(task_image_0), self.post.image.name)
 
     def test_index_show_correct_context(self):
         """Шаблон index сформирован с правильным контекстом."""
@@ -183,18 +185,55 @@ class PostPagesTests(TestCase):
         self.assertEqual(comment.text, comment_form['text'])
 
     def test_index_cache(self):
-        """Тестируем кэш index."""
+        """Тестируем кэш index: новый пост виден сразу."""
         response1 = self.authorized_author.get(reverse('posts:index'))
+        with self.assertTemplateNotUsed('posts/includes/post_card.html'):
+            response2 = self.authorized_author.get(reverse('posts:index'))
+        self.assertEqual(response1.content, response2.content)
         Post.objects.create(
             text='Testing cache',
             author=self.author,
             group=self.group
         )
-        response2 = self.authorized_author.get(reverse('posts:index'))
-        self.assertEqual(response1.content, response2.content)
-        cache.clear()
         response3 = self.authorized_author.get(reverse('posts:index'))
         self.assertNotEqual(response3.content, response2.content)
+        self.assertContains(response3, 'Testing cache')
+
+    def test_group_and_profile_fragment_cache(self):
+        """Фрагменты группы и профиля обновляются после записи."""
+        urls = (
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.authorized_author.get(url)
+                with self.assertTemplateNotUsed(
+                    'posts/includes/post_card.html'
+                ):
+                    self.authorized_author.get(url)
+                post = Post.objects.create(
+                    text=f'Новый пост {url}',
+                    author=self.author,
+                    group=self.group
+                )
+                self.assertContains(
+                    self.authorized_author.get(url), post.text
+                )
+
+    def test_follow_fragment_cache(self):
+        """Фрагмент ленты подписок обновляется после поста и подписки."""
+        url = reverse('posts:follow_index')
+        Follow.objects.create(user=self.user, author=self.author)
+        self.not_author.get(url)
+        with self.assertTemplateNotUsed('posts/includes/post_card.html'):
+            self.not_author.get(url)
+        post = Post.objects.create(text='Новый в ленте', author=self.author)
+        self.assertContains(self.not_author.get(url), post.text)
+        other = User.objects.create(username='Other_author')
+        other_post = Post.objects.create(text='Другой автор', author=other)
+        Follow.objects.create(user=self.user, author=other)
+        self.assertContains(self.not_author.get(url), other_post.text)
 
     def test_follower_can_subscribe(self):
         """ Проверка: авторизованный пользователь
@@ -314,3 +353,198 @@ class PaginatorViewsTest(TestCase):
                         self.assertEqual(
                             len(response.context['page_obj']), count
                         )
+
+    def test_cursor_pages(self):
+        """ Проверка: курсорная пагинация проходит ленту без пропусков
+        и возвращается назад"""
+        response = self.not_author.get(reverse('posts:index'))
+        first_page = list(response.context['page_obj'])
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.not_author.get(
+            reverse('posts:index') + f'?cursor={next_cursor}'
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            len(page_obj), self.posts_counts - settings.COUNT_POSTS
+        )
+        # У всех страниц курсора number=None: фрагмент кэша не должен
+        # достаться от первой страницы.
+        self.assertContains(
+            response, reverse('posts:post_detail', args=(page_obj[0].pk,))
+        )
+        self.assertFalse(page_obj.has_next())
+        self.assertEqual(
+            set(first_page + list(page_obj)), set(Post.objects.all())
+        )
+        response = self.not_author.get(
+            reverse('posts:index') + f'?cursor={page_obj.previous_cursor}'
+        )
+        self.assertEqual(list(response.context['page_obj']), first_page)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_broken_cursor(self):
+        """ Проверка: испорченный курсор открывает первую страницу"""
+        response = self.not_author.get(
+            reverse('posts:index') + '?cursor=broken'
+        )
+        self.assertEqual(
+            len(response.context['page_obj']), settings.COUNT_POSTS
+        )
+
+    def test_cursor_past_feed_ends(self):
+        """ Проверка: курсор за краем ленты открывает первую страницу"""
+        for raw in (
+            'n|2000-01-01T00:00:00+00:00|1', 'p|2100-01-01T00:00:00+00:00|1'
+        ):
+            with self.subTest(raw=raw):
+                cursor = urlsafe_base64_encode(raw.encode())
+                response = self.not_author.get(
+                    reverse('posts:index') + f'?cursor={cursor}'
+                )
+                page_obj = response.context['page_obj']
+                self.assertEqual(len(page_obj), settings.COUNT_POSTS)
+                self.assertFalse(page_obj.has_previous())
+
+
+class ViewerStateTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+        cls.user = User.objects.create(username='Test_reader')
+        cls.group = Group.objects.create(
+            title='тестовая группа',
+            slug='test_group'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Test{count}', author=cls.author, group=cls.group)
+            for count in range(5)
+        )
+        cls.post = Post.objects.first()
+        cls.comment = Comment.objects.create(
+            text='Комментарий', post=cls.post, author=cls.author
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader = Client()
+        self.reader.force_login(self.user)
+
+    def test_liked_and_followed_flags(self):
+        """Посты и комментарии знают, лайкнул ли их зритель."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.reader.get(
+            reverse('posts:add_like_to_post', args=(self.post.pk,)),
+            HTTP_REFERER='/'
+        )
+        self.reader.get(
+            reverse('posts:add_like_to_comment', args=(self.comment.pk,))
+        )
+        response = self.reader.get(
+            reverse('posts:group_list', args=(self.group.slug,))
+        )
+        for post in response.context['page_obj']:
+            with self.subTest(post=post):
+                self.assertEqual(post.liked, post == self.post)
+                self.assertTrue(post.author_followed)
+        response = self.reader.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertTrue(response.context['post'].liked)
+        self.assertTrue(response.context['comments'][0].liked)
+        self.assertTrue(response.context['following'])
+
+    def test_queries_do_not_grow_with_page(self):
+        """Число запросов зрителя не зависит от числа постов на странице."""
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        self.reader.get(url)
+        with self.assertNumQueries(6):
+            self.reader.get(url)
+        Post.objects.bulk_create(
+            Post(text=f'More{count}', author=self.author, group=self.group)
+            for count in range(4)
+        )
+        cache.clear()
+        self.reader.get(url)
+        with self.assertNumQueries(6):
+            self.reader.get(url)
+
+
+class JsonActionsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Test_author')
+        cls.user = User.objects.create(username='Test_reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.comment = Comment.objects.create(
+            text='Комментарий', post=cls.post, author=cls.author
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader = Client()
+        self.reader.force_login(self.user)
+
+    def test_like_json(self):
+        """Лайк через JSON возвращает новое состояние и число лайков."""
+        urls = (
+            reverse('posts:add_like_to_post_json', args=(self.post.pk,)),
+            reverse(
+                'posts:add_like_to_comment_json', args=(self.comment.pk,)
+            ),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader.post(url)
+                self.assertEqual(
+                    response.json(), {'liked': True, 'likes_count': 1}
+                )
+                response = self.reader.post(url)
+                self.assertEqual(
+                    response.json(), {'liked': False, 'likes_count': 0}
+                )
+                self.assertEqual(
+                    self.reader.get(url).status_code,
+                    HTTPStatus.METHOD_NOT_ALLOWED
+                )
+
+    def test_follow_json(self):
+        """Подписка и отписка через JSON возвращают число подписчиков."""
+        response = self.reader.post(
+            reverse('posts:profile_follow_json', args=(self.author,))
+        )
+        self.assertEqual(
+            response.json(), {'following': True, 'followers_count': 1}
+        )
+        response = self.reader.post(
+            reverse('posts:profile_unfollow_json', args=(self.author,))
+        )
+        self.assertEqual(
+            response.json(), {'following': False, 'followers_count': 0}
+        )
+        self.assertFalse(Follow.objects.exists())
+
+    def test_comment_json(self):
+        """Комментарий через JSON создаётся и возвращается разметкой."""
+        url = reverse('posts:add_comment_json', args=(self.post.pk,))
+        response = self.reader.post(url, {'text': 'Новый комментарий'})
+        data = response.json()
+        self.assertEqual(data['comments_count'], 2)
+        self.assertIn('Новый комментарий', data['html'])
+        response = self.reader.post(url, {'text': ''})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('text', response.json()['errors'])
+
+    def test_js_hooks_rendered(self):
+        """Счётчик комментариев и адреса подписки есть всегда."""
+        post = Post.objects.create(text='Без комментариев', author=self.author)
+        response = self.reader.get(
+            reverse('posts:post_detail', args=(post.pk,))
+        )
+        self.assertContains(response, 'class="js-comments-count">0<')
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                self.assertContains(
+                    response, reverse(name, args=(self.author.username,))
+                )
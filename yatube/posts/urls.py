@@ -7,6 +7,7 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('search/', views.search, name='search'),
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
@@ -20,6 +21,21 @@ urlpatterns = [
         views.like_to_comment,
         name='add_like_to_comment'
     ),
+    path(
+        'posts/<int:post_id>/like/json/',
+        views.like_to_post_json,
+        name='add_like_to_post_json'
+    ),
+    path(
+        'posts/comment<int:comment_id>/like/json/',
+        views.like_to_comment_json,
+        name='add_like_to_comment_json'
+    ),
+    path(
+        'posts/<int:post_id>/comment/json/',
+        views.add_comment_json,
+        name='add_comment_json'
+    ),
     path(
         'posts/comment/<int:comment_id>/',
         views.del_comment, name='del_comment'
@@ -39,4 +55,14 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path(
+        'profile/<str:username>/follow/json/',
+        views.profile_follow_json,
+        name='profile_follow_json'
+    ),
+    path(
+        'profile/<str:username>/unfollow/json/',
+        views.profile_unfollow_json,
+        name='profile_unfollow_json'
+    ),
 ]
@@ -1,8 +1,219 @@
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_text
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
+from core.caching import get_or_compute
 
-def posts_paginator(request, posts):
-    paginator = Paginator(posts, settings.COUNT_POSTS)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+NEXT = 'n'
+PREVIOUS = 'p'
+
+# Ключ (дата, id), по которому лента сортируется и листается.
+POST_KEYS = ('pub_date', 'pk')
+
+
+def encode_cursor(post, direction):
+    """Упаковывает позицию (pub_date, id) поста в непрозрачный токен."""
+    raw = f'{direction}|{post.pub_date.isoformat()}|{post.pk}'
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def decode_cursor(token):
+    """Разбирает токен курсора, при ошибке возвращает None."""
+    try:
+        direction, pub_date, pk = force_text(
+            urlsafe_base64_decode(token)
+        ).split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Page):
+    """Страница ленты, полученная поиском по ключу (pub_date, id).
+
+    Не знает ни своего номера, ни общего числа страниц, поэтому
+    не выполняет COUNT(*) и не использует OFFSET.
+    """
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return None
+
+    def previous_page_number(self):
+        return None
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+    @property
+    def next_cursor(self):
+        if self.has_next() and self.object_list:
+            return encode_cursor(self.object_list[-1], NEXT)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.object_list:
+            return encode_cursor(self.object_list[0], PREVIOUS)
+        return None
+
+
+def ordering(keys):
+    return tuple(f'-{key}' for key in keys)
+
+
+def seek(keys, lookup, pub_date, pk):
+    """Условие «ключ после (pub_date, pk)» для lookup lt или gt."""
+    date_key, id_key = keys
+    return Q(**{f'{date_key}__{lookup}': pub_date}) | Q(**{
+        date_key: pub_date, f'{id_key}__{lookup}': pk
+    })
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, id) вместо COUNT(*) и OFFSET.
+
+    Глубокие страницы стоят столько же, сколько первая: выборка
+    идёт по индексу, начиная с позиции из токена. keys - поля ключа,
+    если индекс не по полям поста (см. posts.feed.KEYS).
+    """
+
+    def __init__(self, object_list, per_page, keys=POST_KEYS, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.keys = keys
+
+    def page(self, cursor):
+        decoded = decode_cursor(cursor) if cursor else None
+        posts = self.object_list.order_by(*ordering(self.keys))
+        if decoded is None:
+            items = list(posts[:self.per_page + 1])
+            return CursorPage(
+                items[:self.per_page], self, len(items) > self.per_page,
+                False
+            )
+        direction, pub_date, pk = decoded
+        if direction == NEXT:
+            items = list(posts.filter(
+                seek(self.keys, 'lt', pub_date, pk)
+            )[:self.per_page + 1])
+            page = CursorPage(
+                items[:self.per_page], self, len(items) > self.per_page, True
+            )
+        else:
+            items = list(posts.filter(
+                seek(self.keys, 'gt', pub_date, pk)
+            ).order_by(*self.keys)[:self.per_page + 1])
+            page = CursorPage(
+                items[:self.per_page][::-1], self, True,
+                len(items) > self.per_page
+            )
+        if not items:
+            # Курсор за краем ленты (посты удалены, токен подделан).
+            return self.page(None)
+        return page
+
+    def get_page(self, cursor):
+        return self.page(cursor)
+
+
+def feed_count_key(feed):
+    return f'feed_count:{feed}'
+
+
+def invalidate_feed_counts(*feeds):
+    cache.delete_many([feed_count_key(feed) for feed in feeds])
+
+
+class FeedPaginator(Paginator):
+    """Пагинатор с кэшированным числом постов ленты.
+
+    COUNT(*) выполняется один раз на ленту и живёт в кэше до
+    ближайшей записи (см. posts.signals) или до FEED_COUNT_TIMEOUT.
+    Вместо полного page_range шаблону отдаётся окно номеров
+    вокруг текущей страницы.
+    """
+
+    def __init__(self, object_list, per_page, feed=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.feed = feed
+
+    @cached_property
+    def count(self):
+        if self.feed is None:
+            return Paginator.count.func(self)
+        return get_or_compute(
+            feed_count_key(self.feed), lambda: Paginator.count.func(self),
+            settings.FEED_COUNT_TIMEOUT, name='feed_count'
+        )
+
+    def page_window(self, number, on_each_side=None, on_ends=1):
+        """Номера страниц вокруг number; None обозначает пропуск."""
+        if on_each_side is None:
+            on_each_side = settings.PAGE_WINDOW
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2 + 1:
+            return list(self.page_range)
+        window = []
+        if number > on_each_side + on_ends + 1:
+            window.extend(range(1, on_ends + 1))
+            window.append(None)
+            window.extend(range(number - on_each_side, number + 1))
+        else:
+            window.extend(range(1, number + 1))
+        if number < num_pages - on_each_side - on_ends:
+            window.extend(range(number + 1, number + on_each_side + 1))
+            window.append(None)
+            window.extend(range(num_pages - on_ends + 1, num_pages + 1))
+        else:
+            window.extend(range(number + 1, num_pages + 1))
+        return window
+
+
+def posts_paginator(request, posts, feed=None, keys=POST_KEYS):
+    """Постраничный вывод ленты.
+
+    Параметр ?cursor= включает режим поиска по ключу, ?page= -
+    обычную нумерацию. Ссылка «Следующая» с нумерованной страницы
+    ведёт уже в режим курсора, чтобы дальнейшая прокрутка не
+    требовала OFFSET. feed - имя ленты для кэша числа постов, keys -
+    поля ключа сортировки.
+    """
+    posts = posts.order_by(*ordering(keys))
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return CursorPaginator(
+            posts, settings.COUNT_POSTS, keys=keys
+        ).get_page(cursor)
+    paginator = FeedPaginator(posts, settings.COUNT_POSTS, feed=feed)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.page_window = paginator.page_window(page_obj.number)
+    # Обычное значение, как у CursorPage; страница остаётся Page.
+    page_obj.next_cursor = (
+        encode_cursor(page_obj[-1], NEXT) if page_obj.has_next() else None
+    )
+    return page_obj
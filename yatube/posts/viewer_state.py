@@ -0,0 +1,34 @@
+from . import follow_graph
+from .likes import liked_ids
+from .models import Comment, Post
+
+
+def load_viewer_state(user, posts=(), comments=(), authors=()):
+    """Проставляет постам и комментариям состояние для зрителя user.
+
+    post.liked / comment.liked - лайкнул ли зритель, post.author_followed -
+    подписан ли он на автора поста. Лайки - по запросу на связь,
+    независимо от числа объектов на странице, подписки берутся из
+    графа подписок в кэше (posts.follow_graph). Возвращает множество id
+    авторов (из постов и authors), на которых подписан зритель.
+    """
+    posts = list(posts)
+    comments = list(comments)
+    if not user.is_authenticated:
+        liked_posts = liked_comments = followed = set()
+    else:
+        liked_posts = liked_ids(user, Post, posts)
+        liked_comments = liked_ids(user, Comment, comments)
+        author_ids = {post.author_id for post in posts}
+        author_ids.update(author.pk for author in authors)
+        graph = follow_graph.followed_ids(user)
+        followed = {
+            author_id for author_id in author_ids
+            if follow_graph.contains(graph, author_id)
+        }
+    for post in posts:
+        post.liked = post.pk in liked_posts
+        post.author_followed = post.author_id in followed
+    for comment in comments:
+        comment.liked = comment.pk in liked_comments
+    return followed
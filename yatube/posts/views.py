@@ -1,25 +1,47 @@
 from django.contrib.auth.decorators import login_required
-from django.contrib.contenttypes.models import ContentType
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_POST
 
+from core import thumbnails
+
+from . import feed
+from .conditional import conditional_page
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User, Like
+from .likes import toggle_like
+from .models import Comment, Follow, Group, Post, User, UserStats
+from .page_cache import (
+    cache_anonymous_page, follow_scopes, group_scopes, index_scopes,
+    post_detail_scopes, profile_scopes, request_scopes
+)
+from .search import SearchResults
+from .stats import get_stats
 from .utils import posts_paginator
+from .viewer_state import load_viewer_state
 
 
+@conditional_page(index_scopes)
+@cache_anonymous_page(index_scopes)
 def index(request):
     post_list = Post.objects.select_related('author', 'group').all()
-    page_obj = posts_paginator(request, post_list)
+    page_obj = posts_paginator(request, post_list, feed='index')
+    load_viewer_state(request.user, page_obj)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_scopes)
+@cache_anonymous_page(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     post_list = group.posts.select_related('author').all()
-    page_obj = posts_paginator(request, post_list)
+    page_obj = posts_paginator(
+        request, post_list, feed=f'group:{group.pk}'
+    )
+    load_viewer_state(request.user, page_obj)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -27,40 +49,67 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(profile_scopes)
+@cache_anonymous_page(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = request.user.is_authenticated and author.following.filter(
-        user=request.user,
-    ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     post_list = author.posts.select_related('group').all()
-    page_obj = posts_paginator(request, post_list)
+    page_obj = posts_paginator(
+        request, post_list, feed=f'author:{author.pk}'
+    )
+    following = author.pk in load_viewer_state(
+        request.user, page_obj, authors=(author,)
+    )
+    thumbnails.attach([author])
     context = {
         'author': author,
+        'stats': get_stats(author),
         'page_obj': page_obj,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_detail_scopes)
+@cache_anonymous_page(post_detail_scopes)
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.prefetch_related('comments__author'),
+        Post.objects.select_related(
+            'author__stats', 'group'
+        ).prefetch_related('comments__author'),
         pk=post_id
     )
-    following = request.user.is_authenticated and post.author.following.filter(
-        user=request.user,
-    ).exists()
+    comments = list(post.comments.all())
+    following = post.author_id in load_viewer_state(
+        request.user, (post,), comments
+    )
+    thumbnails.attach([post])
+    thumbnails.attach([post.author])
     form = CommentForm()
     context = {
         'author': post.author,
+        'stats': get_stats(post.author),
         'post': post,
         'form': form,
-        'comments': post.comments.all(),
+        'comments': comments,
         'following': following,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = SearchResults(query, request.GET.get('cursor'))
+    load_viewer_state(request.user, results)
+    context = {
+        'query': query,
+        'results': results,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -72,6 +121,7 @@ def post_create(request):
     post_object: Post = form.save(commit=False)
     post_object.author = request.user
     post_object.save()
+    thumbnails.schedule(post_object)
     return redirect('posts:profile', request.user)
 
 
@@ -88,6 +138,8 @@ def post_edit(request, post_id):
     if not form.is_valid():
         return render(request, 'posts/post_create.html', {'form': form})
     form.save()
+    if 'image' in form.changed_data:
+        thumbnails.schedule(post)
     return redirect('posts:post_detail', post_id)
 
 
@@ -122,13 +174,22 @@ def del_comment(request, comment_id):
 
 
 @login_required
+@conditional_page(follow_scopes)
 def follow_index(request):
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related('author', 'group')
-    page_obj = posts_paginator(request, post_list)
+    post_list = feed.follow_feed(request.user).select_related(
+        'author', 'group'
+    )
+    page_obj = posts_paginator(
+        request, post_list, feed=f'follow:{request.user.pk}', keys=feed.KEYS
+    )
+    load_viewer_state(request.user, page_obj)
     context = {
         'page_obj': page_obj,
+        # Фрагмент ленты сбрасывают посты авторов и подписки зрителя.
+        'feed_scopes': [
+            *request_scopes(request, follow_scopes, (), {}),
+            f'viewer:{request.user.pk}',
+        ],
     }
     return render(request, 'posts/follow.html', context)
 
@@ -147,38 +208,117 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     # Дизлайк, отписка
-    get_object_or_404(Follow, author__username=username).delete()
+    get_object_or_404(
+        Follow, user=request.user, author__username=username
+    ).delete()
     return redirect('posts:profile', username)
 
 
 @login_required
 def like_to_post(request, post_id):
-    post = Post.objects.get(pk=post_id)
-    post_type = ContentType.objects.get_for_model(post)
-    if request.user != post.author:
-        if post.likes.filter(liked_by=request.user, ).exists():
-            Like.objects.filter(
-                content_type=post_type, object_id=post.id, liked_by=request.user
-            ).delete()
-        else:
-            Like.objects.create(
-                content_type=post_type, object_id=post.id,
-                liked_by=request.user)
-
-    # return redirect('posts:post_detail', post_id=post_id)
+    post = get_object_or_404(Post.objects.only('author'), pk=post_id)
+    if request.user.pk != post.author_id:
+        toggle_like(post, request.user)
     return redirect(request.META.get('HTTP_REFERER'))
 
 
 @login_required
 def like_to_comment(request, comment_id):
-    obj = Comment.objects.get(pk=comment_id)
-    obj_type = ContentType.objects.get_for_model(obj)
-    if request.user != obj.author:
-        if obj.likes.filter(liked_by=request.user, ).exists():
-            Like.objects.filter(
-                content_type=obj_type, object_id=obj.id, liked_by=request.user
-            ).delete()
-        else:
-            Like.objects.create(
-                content_type=obj_type, object_id=obj.id, liked_by=request.user)
-    return redirect('posts:post_detail', post_id=obj.post_id)
+    comment = get_object_or_404(
+        Comment.objects.only('author', 'post'), pk=comment_id
+    )
+    if request.user.pk != comment.author_id:
+        toggle_like(comment, request.user)
+    return redirect('posts:post_detail', post_id=comment.post_id)
+
+
+# JSON-версии действий: выполняют одну запись и возвращают новое
+# состояние без редиректа и повторной отрисовки страницы.
+
+@require_POST
+@login_required
+def like_to_post_json(request, post_id):
+    post = get_object_or_404(Post.objects.only('author'), pk=post_id)
+    if request.user.pk == post.author_id:
+        return JsonResponse(
+            {'error': 'Нельзя лайкнуть свой пост.'}, status=403
+        )
+    liked = toggle_like(post, request.user)
+    return JsonResponse({
+        'liked': liked,
+        'likes_count': Post.objects.values_list(
+            'likes_count', flat=True
+        ).get(pk=post_id),
+    })
+
+
+@require_POST
+@login_required
+def like_to_comment_json(request, comment_id):
+    comment = get_object_or_404(
+        Comment.objects.only('author'), pk=comment_id
+    )
+    if request.user.pk == comment.author_id:
+        return JsonResponse(
+            {'error': 'Нельзя лайкнуть свой комментарий.'}, status=403
+        )
+    liked = toggle_like(comment, request.user)
+    return JsonResponse({
+        'liked': liked,
+        'likes_count': Comment.objects.values_list(
+            'likes_count', flat=True
+        ).get(pk=comment_id),
+    })
+
+
+@require_POST
+@login_required
+def add_comment_json(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    form = CommentForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+    comment.liked = False
+    return JsonResponse({
+        'id': comment.pk,
+        'comments_count': Post.objects.values_list(
+            'comments_count', flat=True
+        ).get(pk=post_id),
+        'html': render_to_string(
+            'posts/includes/comment.html',
+            {'comment': comment, 'user': request.user},
+        ),
+    })
+
+
+def follow_state(author, following):
+    return JsonResponse({
+        'following': following,
+        'followers_count': UserStats.objects.values_list(
+            'followers_count', flat=True
+        ).filter(user=author).first() or 0,
+    })
+
+
+@require_POST
+@login_required
+def profile_follow_json(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    if author.pk == request.user.pk:
+        return JsonResponse(
+            {'error': 'Нельзя подписаться на себя.'}, status=403
+        )
+    Follow.objects.get_or_create(user=request.user, author=author)
+    return follow_state(author, True)
+
+
+@require_POST
+@login_required
+def profile_unfollow_json(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    Follow.objects.filter(user=request.user, author=author).delete()
+    return follow_state(author, False)
@@ -0,0 +1,93 @@
+// Лайки, подписки и комментарии без перезагрузки страницы.
+// Без JavaScript ссылки и формы работают как обычно.
+(function () {
+  'use strict';
+
+  // Cookie csrftoken выставляется Django при входе на сайт.
+  var csrfToken = (document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/) || [])[1];
+
+  function postJson(url, body) {
+    return fetch(url, {
+      method: 'POST',
+      credentials: 'same-origin',
+      headers: {'X-CSRFToken': csrfToken},
+      body: body
+    }).then(function (response) {
+      var type = response.headers.get('Content-Type') || '';
+      if (!response.ok || type.indexOf('application/json') === -1) {
+        throw response;
+      }
+      return response.json();
+    });
+  }
+
+  function onLike(link) {
+    postJson(link.dataset.jsonUrl).then(function (data) {
+      link.classList.toggle('bi-suit-heart-fill', data.liked);
+      link.classList.toggle('bi-suit-heart', !data.liked);
+      var count = link.parentNode.querySelector('.js-like-count');
+      if (count) {
+        count.textContent = data.likes_count;
+      }
+    }).catch(function () {
+      window.location = link.href;
+    });
+  }
+
+  function onFollow(button) {
+    var following = button.dataset.following === '1';
+    var url = following ? button.dataset.unfollowUrl : button.dataset.followUrl;
+    postJson(url).then(function (data) {
+      button.dataset.following = data.following ? '1' : '0';
+      // Без JavaScript (или при ошибке) ссылка ведёт на обратное действие.
+      button.href = data.following ? button.dataset.unfollowHref : button.dataset.followHref;
+      button.textContent = data.following ? 'Отписаться' : 'Подписаться';
+      button.classList.toggle('btn-light', data.following);
+      button.classList.toggle('btn-primary', !data.following);
+      var count = document.querySelector('.js-followers-count');
+      if (count) {
+        count.textContent = data.followers_count;
+      }
+    }).catch(function () {
+      window.location = button.href;
+    });
+  }
+
+  function onComment(form) {
+    postJson(form.dataset.jsonUrl, new FormData(form)).then(function (data) {
+      document.getElementById('comments').insertAdjacentHTML(
+        'afterbegin', data.html
+      );
+      var count = document.querySelector('.js-comments-count');
+      if (count) {
+        count.textContent = data.comments_count;
+        document.querySelector('.js-has-comments').hidden = false;
+        document.querySelector('.js-no-comments').hidden = true;
+      }
+      form.reset();
+    }).catch(function () {
+      form.submit();
+    });
+  }
+
+  document.addEventListener('click', function (event) {
+    var like = event.target.closest('.js-like');
+    if (like) {
+      event.preventDefault();
+      onLike(like);
+      return;
+    }
+    var follow = event.target.closest('.js-follow');
+    if (follow) {
+      event.preventDefault();
+      onFollow(follow);
+    }
+  });
+
+  document.addEventListener('submit', function (event) {
+    if (event.target.classList.contains('js-comment-form')) {
+      event.preventDefault();
+      onComment(event.target);
+    }
+  });
+})();
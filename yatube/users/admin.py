@@ -1,14 +1,18 @@
 from django.contrib import admin
 
+from core.admin import FastAdminMixin
+
 from .models import User
 
 
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(FastAdminMixin, admin.ModelAdmin):
     list_display = (
         'pk', 'first_name', 'last_name', 'username', 'email', 'image')
     list_editable = ('username',)
     search_fields = ('first_name', 'last_name', 'username', 'email',)
-    list_filter = ('first_name', 'last_name', 'username', 'email',)
+    # Фильтры по имени и почте выводили все значения таблицы
+    # пользователей; искать по этим полям можно поиском.
+    list_filter = ('is_staff', 'is_active')
     empty_value_display = '-пусто-'
 
 
@@ -1,10 +1,11 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 
+from core.uploads import ImageIngestMixin
 from users.models import User
 
 
-class CreationForm(UserCreationForm):
+class CreationForm(ImageIngestMixin, UserCreationForm):
     class Meta:
         model = User
         fields = (
@@ -12,7 +13,7 @@ class CreationForm(UserCreationForm):
             'birth_date')
 
 
-class ChangeForm(forms.ModelForm):
+class ChangeForm(ImageIngestMixin, forms.ModelForm):
     class Meta:
         model = User
         fields = (
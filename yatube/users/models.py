@@ -9,6 +9,21 @@ class User(AbstractUser):
         blank=True,
         null=True,
         help_text='Загрузите аватарку')
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        editable=False
+    )
+    image_bytes = models.PositiveIntegerField(
+        'Размер картинки в байтах',
+        null=True,
+        editable=False
+    )
     birth_date = models.DateField(
         null=True,
         blank=True)
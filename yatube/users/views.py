@@ -3,6 +3,8 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.views.generic import CreateView
 
+from core import thumbnails
+
 from .forms import CreationForm, ChangeForm
 from .models import User
 
@@ -26,4 +28,6 @@ def change_user_profile(request, user_id):
     if not form.is_valid():
         return render(request, 'users/signup.html', {'form': form})
     form.save()
+    if 'image' in form.changed_data:
+        thumbnails.schedule(user)
     return redirect('posts:profile', user.username)
@@ -1,10 +1,31 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-SECRET_KEY = 'h)vc_gh!1t&5ks!2*2=92+9d1lerq239ew28f2_8f^)q(w%348'
+# Окружение выбирается переменной YATUBE_ENV: dev (по умолчанию) или
+# production. В production выключены отладка и debug_toolbar, шаблоны
+# кэшируются, соединения с базой переиспользуются, а команда check
+# отказывается работать с медленными настройками (core.checks).
+ENVIRONMENT = os.environ.get('YATUBE_ENV', 'dev')
+PRODUCTION = ENVIRONMENT == 'production'
 
-DEBUG = True
+SECRET_KEY = os.environ.get(
+    'YATUBE_SECRET_KEY',
+    'h)vc_gh!1t&5ks!2*2=92+9d1lerq239ew28f2_8f^)q(w%348'
+)
+
+DEBUG = not PRODUCTION
+
+# Запуск тестов: manage.py test или pytest. Кэш и загрузки тестов
+# пишутся в свой временный каталог на каждый запуск.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    TEST_DIR = tempfile.mkdtemp(prefix='yatube-test-')
+    atexit.register(shutil.rmtree, TEST_DIR, ignore_errors=True)
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -27,20 +48,23 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -52,7 +76,6 @@ TEMPLATES = [
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
-                'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
@@ -62,12 +85,32 @@ TEMPLATES = [
     },
 ]
 
+if DEBUG:
+    TEMPLATES[0]['OPTIONS']['context_processors'].insert(
+        0, 'django.template.context_processors.debug'
+    )
+
+if PRODUCTION:
+    # Шаблоны компилируются один раз на процесс.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# В production соединение живёт CONN_MAX_AGE секунд и переживает
+# запросы, а не открывается заново на каждый.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.environ.get(
+            'YATUBE_CONN_MAX_AGE', 60 if PRODUCTION else 0
+        )),
     }
 }
 
@@ -102,12 +145,126 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
-# STATIC_ROOT = os.path.join(BASE_DIR, 'static/')
+# Сюда collectstatic собирает статику с хэшами в именах и сжатыми
+# копиями (core.staticfiles); отсюда её отдаёт веб-сервер.
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+
+# Уровни сжатия ответов (core.middleware) по типу содержимого:
+# {кодировка: (уровень, уровень для ответов больше COMPRESS_LARGE_SIZE
+# и потоковых)}. Типов, которых здесь нет, middleware не сжимает.
+COMPRESS_LEVELS = {
+    'text/html': {'br': (5, 4), 'gzip': (6, 5)},
+    'application/json': {'br': (5, 4), 'gzip': (6, 5)},
+    'text/plain': {'br': (5, 4), 'gzip': (6, 5)},
+    'application/xml': {'br': (5, 4), 'gzip': (6, 5)},
+    # Статика меняется редко, на неё можно потратить больше времени.
+    'text/css': {'br': (9, 5), 'gzip': (9, 6)},
+    'text/javascript': {'br': (9, 5), 'gzip': (9, 6)},
+    'application/javascript': {'br': (9, 5), 'gzip': (9, 6)},
+    'image/svg+xml': {'br': (9, 5), 'gzip': (9, 6)},
+}
+
+# Ответы меньше этого размера, в байтах, не сжимаются: выигрыш меньше
+# накладных расходов.
+COMPRESS_MIN_SIZE = 512
+COMPRESS_LARGE_SIZE = 256 * 1024
+
+# Какие файлы статики сжимать заранее и с какого размера, в байтах.
+STATIC_COMPRESS_EXTENSIONS = (
+    '.css', '.js', '.svg', '.json', '.txt', '.xml', '.map', '.ico'
+)
+STATIC_COMPRESS_MIN_SIZE = 256
+
 COUNT_POSTS = 10
 
+# Сколько секунд живёт закэшированное число постов ленты.
+FEED_COUNT_TIMEOUT = 60 * 5
+
+# Посты авторов, у которых подписчиков больше этого числа, не раздаются
+# по лентам при публикации, а подтягиваются при чтении ленты подписок.
+FEED_FANOUT_LIMIT = 1000
+
+# Сколько последних постов автора добавлять в ленту при подписке.
+FEED_BACKFILL_LIMIT = 1000
+
+# Как часто пересчитывать список таких «популярных» авторов, в секундах.
+FEED_PULLED_TIMEOUT = 60 * 10
+
+# Сколько секунд хранится в кэше список подписок пользователя;
+# при подписке и отписке он сбрасывается сразу.
+FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
+
+# Сколько номеров страниц показывать по обе стороны от текущей.
+PAGE_WINDOW = 2
+
+# Искать по таблице SQLite FTS5, если она есть. При False используется
+# индекс SearchTerm; после переключения выполните rebuild_search_index.
+SEARCH_USE_FTS = True
+
+# Сколько хранятся страницы для анонимов (posts.page_cache). None -
+# пока не изменится что-то, что на них показано.
+PAGE_CACHE_TIMEOUT = None
+
+# Сколько хранятся фрагменты {% generation_cache %}. Запись в то, что
+# показано во фрагменте, сбрасывает его сразу.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# core.caching.get_or_compute: сколько секунд отдавать устаревшее
+# значение, пока один запрос его пересчитывает; сколько держится
+# блокировка пересчёта и сколько ждут её другие запросы; коэффициент
+# раннего истечения (0 - выключено); как часто сбрасывать метрики
+# процесса в общий кэш.
+CACHE_STALE_TTL = 60
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_WAIT = 2
+CACHE_EARLY_EXPIRY_BETA = 1.0
+CACHE_METRICS_FLUSH = 10
+
+# Загрузки сразу пишутся во временный файл, а не копятся в памяти.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Приём картинок (core.uploads): пределы загрузки и параметры
+# сохраняемого мастера.
+UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+UPLOAD_MAX_PIXELS = 40 * 10 ** 6
+UPLOAD_MAX_SIDE = 2560
+UPLOAD_JPEG_QUALITY = 85
+
+# Миниатюры, которые шаблоны берут у полей моделей: геометрия и
+# параметры sorl.thumbnail (core.thumbnails), первая - самая крупная.
+# Все ширины попадают в srcset тега {% picture %}; при THUMBNAIL_WEBP
+# и поддержке в Pillow - ещё и в WEBP. Миниатюры создаются в
+# фоне после загрузки картинки; THUMBNAIL_WORKERS - число потоков,
+# 0 - сразу после коммита в том же потоке. Страница без готовой
+# миниатюры показывает исходник и ставит миниатюру в очередь не чаще
+# раза в THUMBNAIL_PENDING_TIMEOUT секунд.
+THUMBNAIL_PRESETS = {
+    'posts.Post.image': [
+        ('960x600', {'crop': 'center', 'upscale': True}),
+        ('640x400', {'crop': 'center', 'upscale': True}),
+        ('320x200', {'crop': 'center', 'upscale': True}),
+    ],
+    'users.User.image': [
+        ('360x480', {'crop': 'center', 'upscale': True}),
+        ('180x240', {'crop': 'center', 'upscale': True}),
+    ],
+}
+THUMBNAIL_WEBP = True
+# В тестах пула нет: поток не должен писать в MEDIA_ROOT теста после
+# его удаления или в настоящий media/ после восстановления настроек.
+THUMBNAIL_WORKERS = 0 if TESTING else 2
+THUMBNAIL_PENDING_TIMEOUT = 60
+
+# До скольких строк админка считает объекты в списке точно; дальше
+# число оценивается (core.admin.EstimatedCountPaginator).
+ADMIN_COUNT_LIMIT = 10000
+
 LOGIN_URL = 'users:login'
 
 LOGOUT_URL = 'users:logout'
@@ -123,11 +280,48 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_ROOT = os.path.join(TEST_DIR if TESTING else BASE_DIR, 'media')
+
+# Загрузки хранятся под хэшем содержимого (core.storage), поэтому их
+# можно кэшировать бессрочно: core.views.media (в dev) и веб-сервер
+# (deploy/nginx.conf, в production) отдают такие файлы с
+# Cache-Control: immutable на MEDIA_CACHE_MAX_AGE секунд. Миниатюры
+# sorl уже названы по хэшу и пишутся в обычное хранилище.
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Двухуровневый кэш (core.cache): LRU в памяти каждого воркера перед
+# общим для воркеров файлом SQLite. В production файл лежит рядом с
+# проектом, а не во временном каталоге: у сервисов он бывает свой
+# (PrivateTmp), и воркеры не увидели бы записей друг друга.
+if TESTING:
+    # Свой файл на каждый запуск: тесты не видят кэш dev-сервера и
+    # других запусков и не портят его.
+    CACHE_LOCATION = os.path.join(TEST_DIR, 'cache.sqlite3')
+else:
+    CACHE_LOCATION = os.environ.get(
+        'YATUBE_CACHE_LOCATION',
+        os.path.join(BASE_DIR, 'cache.sqlite3') if PRODUCTION
+        else os.path.join(tempfile.gettempdir(), 'yatube-cache.sqlite3')
+    )
 
+# MAX_ENTRIES ограничивает и ключи без срока (страницы с
+# PAGE_CACHE_TIMEOUT=None): сверх него старейшие по записи вытесняются.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': CACHE_LOCATION,
+        'OPTIONS': {
+            'L1_MAX_ENTRIES': 5000 if PRODUCTION else 1000,
+            'SYNC_INTERVAL': 0.5,
+            'MAX_ENTRIES': 200000 if PRODUCTION else 20000,
+            'CULL_FREQUENCY': 10,
+        },
     }
 }
+
+if PRODUCTION:
+    # Сессия читается из общего кэша, а не из базы на каждый запрос.
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 AUTH_USER_MODEL = 'users.User'